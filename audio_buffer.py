@@ -0,0 +1,118 @@
+import threading
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size ring of audio chunks, preallocated once and read as memoryview slices without copying.
+
+    Chunks are numbered by position. Readers keep their own position, so several readers can follow
+    the same audio and a reader can go back to replay recent chunks. A reader that falls more than
+    capacity chunks behind loses the overwritten chunks, which are counted in overflows.
+    """
+    def __init__(self, chunk_size, capacity):
+        self.chunk_size = chunk_size
+        self.capacity = capacity
+        self._data = bytearray(chunk_size * capacity)
+        self._view = memoryview(self._data)
+        self._lengths = [0] * capacity
+        self._written = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        # Counters
+        self.overflows = 0
+        self.truncated = 0
+
+    def write(self, data):
+        """Appends a chunk, overwriting the oldest one once the ring is full."""
+        with self._condition:
+            slot = self._written % self.capacity
+            length = min(len(data), self.chunk_size)
+            if length < len(data):
+                self.truncated += 1
+            offset = slot * self.chunk_size
+            self._view[offset:offset + length] = data[:length]
+            self._lengths[slot] = length
+            self._written += 1
+            self._condition.notify_all()
+
+    def position(self):
+        """Returns the position the next chunk will be written to."""
+        with self._condition:
+            return self._written
+
+    def oldest(self):
+        """Returns the position of the oldest chunk still in the ring."""
+        with self._condition:
+            return max(0, self._written - self.capacity)
+
+    def read(self, position, timeout=None):
+        """Waits for the chunk at position; returns (chunk, next position), or (None, position) on timeout or close.
+
+        The memoryview is only valid until capacity more chunks are written; copy it if it is kept longer.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._written > position or self._closed, timeout)
+            if self._written <= position:
+                return None, position
+            oldest = self._written - self.capacity
+            if position < oldest:
+                self.overflows += oldest - position
+                position = oldest
+            slot = position % self.capacity
+            offset = slot * self.chunk_size
+            return self._view[offset:offset + self._lengths[slot]], position + 1
+
+    def close(self):
+        """Wakes up waiting readers; chunks already written can still be read."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class BufferedAudioStream:
+    """Base of the audio sources: records into an AudioRingBuffer and yields the chunks to the speech stream."""
+    def __init__(self, rate, chunk, buffer_seconds):
+        self.rate = rate
+        self.chunk = chunk
+        # 16-bit mono samples
+        self.buffer = AudioRingBuffer(2 * chunk, max(1, int(buffer_seconds * rate / chunk)))
+        self.read_position = 0
+        self.closed = True
+
+    @property
+    def chunk_seconds(self):
+        return self.chunk / self.rate
+
+    @property
+    def dropped_chunks(self):
+        return self.buffer.overflows
+
+    def depth(self):
+        """Returns the number of recorded chunks the speech stream has not read yet."""
+        return self.buffer.position() - self.read_position
+
+    def chunks(self, start=None, until=None):
+        """Yields (position, chunk) pairs, the chunks as memoryviews, from position start (default: now) until the
+        stream is stopped, or until the position returned by until() is reached."""
+        position = self.buffer.position() if start is None else start
+        while True:
+            end = until() if until is not None else None
+            if end is not None and position >= end:
+                return
+            chunk, next_position = self.buffer.read(position, timeout=0.1)
+            if chunk is None:
+                if self.buffer.closed:
+                    return
+                continue
+            self.read_position = next_position
+            yield next_position - 1, chunk
+            position = next_position
+
+    def generator(self, start=None, until=None):
+        """Yields the audio chunks as memoryviews (see chunks())."""
+        for _, chunk in self.chunks(start, until):
+            yield chunk
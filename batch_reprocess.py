@@ -0,0 +1,177 @@
+"""Re-runs idea extraction and scoring over recorded sessions, without microphone or plot.
+
+Sources are archived session folders, transcripts.csv files or 16-bit mono WAV recordings. Sessions
+are spread over a process pool; inside each session the transcripts go through the same extraction
+and scoring stages as a live session, with at most --llm-concurrency LLM requests at a time. Every
+session is recorded into a folder of the same name under --output, like a live session into 'data'.
+
+Usage: python batch_reprocess.py [data/2025-* ...] [--output data_reprocessed] [--processes 4] [--llm-concurrency 2]
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import glob
+import multiprocessing
+import os
+import sys
+import time
+import wave
+import idea_extractor
+from fake_servers import read_transcripts
+from session_store import read_manifest
+from vad import VoiceActivityDetector
+
+REPROCESSED_FOLDERNAME = "data_reprocessed"
+# Recordings are transcribed offline in segments below the 1 minute limit of synchronous recognition,
+# rather than streamed, which the service expects in real time
+RECOGNIZE_SEGMENT_SECONDS = 55
+# Each segment ends in the middle of the longest silence in its last seconds, so no word is cut in two
+SEGMENT_CUT_SEARCH_SECONDS = 15
+
+
+def session_sources(paths):
+    """Expands the given paths into (session name, transcripts.csv or WAV path) pairs."""
+    sources = []
+    for path in map(os.path.abspath, paths):
+        if os.path.isdir(path):
+            transcripts_path = os.path.join(path, "transcripts.csv")
+            recordings = sorted(glob.glob(os.path.join(path, "*.wav")))
+            if os.path.exists(transcripts_path):
+                sources.append((os.path.basename(path), transcripts_path))
+            elif recordings:
+                sources.append((os.path.basename(path), recordings[0]))
+        elif path.lower().endswith(".wav"):
+            sources.append((os.path.splitext(os.path.basename(path))[0], path))
+        elif os.path.exists(path):
+            # A transcripts.csv is named after its session folder
+            sources.append((os.path.basename(os.path.dirname(path)), path))
+    return sources
+
+
+def session_task(session_name, source):
+    """Reads participant and task item from the session.json next to a source, or else from the session name.
+
+    Names are only parsed for archives from before session.json (<date>_<time>_<participant>_<item>).
+    """
+    manifest = read_manifest(os.path.dirname(source))
+    if manifest is not None and manifest.get("item"):
+        return manifest.get("participant"), manifest["item"]
+    parts = session_name.split("_")
+    if len(parts) >= 4:
+        return parts[2], "_".join(parts[3:])
+    return None, None
+
+
+def silence_cuts(audio, rate, max_seconds=RECOGNIZE_SEGMENT_SECONDS, search_seconds=SEGMENT_CUT_SEARCH_SECONDS):
+    """Returns the byte offsets that split 16-bit mono audio into segments of at most max_seconds.
+
+    A segment ends in the middle of the longest silence in its last search_seconds, or at max_seconds
+    if there is none.
+    """
+    chunk_size = rate // 10 * 2  # 100 ms, as from the microphone
+    detector = VoiceActivityDetector(rate)
+    speech = [detector.is_speech(audio[i:i + chunk_size]) for i in range(0, len(audio), chunk_size)]
+    max_chunks, search_chunks = max_seconds * 10, min(search_seconds, max_seconds - 1) * 10
+    cuts, start = [0], 0
+    while len(speech) - start > max_chunks:
+        end = start + max_chunks
+        cut, longest, run = end, 0, 0
+        for index in range(end - search_chunks, end):
+            run = 0 if speech[index] else run + 1
+            if run > longest:
+                longest, cut = run, index + 1 - run // 2
+        cuts.append(cut)
+        start = cut
+    return [cut * chunk_size for cut in cuts] + [len(audio)] if audio else [0]
+
+
+def transcribe_wav(path):
+    """Transcribes a 16-bit mono WAV file with the speech backend; returns the final transcripts."""
+    if idea_extractor.SPEECH_BACKEND != "google":
+        raise ValueError(f"Transcribing {path} needs the 'google' speech backend, not '{idea_extractor.SPEECH_BACKEND}'.")
+    from google.cloud.speech import RecognitionAudio, RecognitionConfig
+    with wave.open(path, "rb") as recording:
+        if recording.getsampwidth() != 2 or recording.getnchannels() != 1:
+            raise ValueError(f"{path} is not a 16-bit mono WAV file.")
+        rate = recording.getframerate()
+        audio = recording.readframes(recording.getnframes())
+
+    speech_client = idea_extractor.get_service("speech")
+    config = RecognitionConfig(
+        encoding=RecognitionConfig.AudioEncoding.LINEAR16,
+        sample_rate_hertz=rate,
+        language_code="en-US",
+    )
+    cuts = silence_cuts(audio, rate)
+    transcripts = []
+    for start, end in zip(cuts, cuts[1:]):
+        response = speech_client.recognize(config=config, audio=RecognitionAudio(content=audio[start:end]))
+        for result in response.results:
+            if result.alternatives and result.alternatives[0].transcript.strip():
+                transcripts.append(result.alternatives[0].transcript.strip())
+    return transcripts
+
+
+async def extract_and_score(session, transcripts, llm_concurrency):
+    """Feeds transcripts through the extraction and scoring stages of a session, which fill its transcripts and ideas."""
+    loop = asyncio.get_running_loop()
+    # One request per transcript, as in a live session where the LLM keeps up with the speaker
+    pipeline = session.create_pipeline(loop, llm_concurrency, coalesce_transcripts=False)
+    pipeline.start()
+    for transcript in transcripts:
+        session.store.add_transcripts([transcript])
+        await pipeline.put((transcript, session.latency_tracer.now()))
+    await pipeline.drain()
+
+
+def reprocess_session(session_name, source, output_folder, llm_concurrency, item=None, verbose=False):
+    """Reprocesses one session into output_folder/session_name."""
+    start = time.perf_counter()
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(sys.stdout if verbose else devnull):
+        participant, session_item = session_task(session_name, source)
+        transcripts = transcribe_wav(source) if source.lower().endswith(".wav") else read_transcripts(source)
+        session = idea_extractor.Session(participant, item or session_item, session_name=session_name, data_folder=output_folder)
+        asyncio.run(extract_and_score(session, transcripts, llm_concurrency))
+        session.archive()
+        idea_extractor.close_services()
+    return {"session": session_name, "transcripts": len(session.transcripts_list), "ideas": len(session.ideas_list),
+            "seconds": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sources", nargs="*", help="session folders, transcripts.csv or WAV files (default: data/*)")
+    parser.add_argument("--output", default=REPROCESSED_FOLDERNAME, help="folder for the reprocessed sessions")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="sessions processed in parallel")
+    parser.add_argument("--llm-concurrency", type=int, default=2, help="LLM requests in flight per session")
+    parser.add_argument("--item", help="task item, if it cannot be read from session.json or the session folder name")
+    parser.add_argument("--verbose", action="store_true", help="show the output of each session")
+    args = parser.parse_args()
+
+    sources = session_sources(args.sources or sorted(glob.glob(os.path.join("data", "*"))))
+    if not sources:
+        print("No sessions with transcripts.csv or WAV recordings found.")
+        return
+    output_folder = os.path.abspath(args.output)
+    os.makedirs(output_folder, exist_ok=True)
+
+    print(f"🔁 Reprocessing {len(sources)} session(s) with {args.processes} process(es) into {output_folder}")
+    start = time.perf_counter()
+    failed = 0
+    # Spawned workers start clean, without connections inherited from this process
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(reprocess_session, name, source, output_folder, args.llm_concurrency, args.item, args.verbose): name
+                   for name, source in sources}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+                print(f"✅ {result['session']}: {result['transcripts']} transcripts, {result['ideas']} ideas in {result['seconds']:.1f} s")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {futures[future]}: {e}")
+    print(f"Done in {time.perf_counter() - start:.1f} s" + (f", {failed} session(s) failed." if failed else "."))
+
+
+if __name__ == "__main__":
+    main()
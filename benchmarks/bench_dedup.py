@@ -0,0 +1,84 @@
+"""Decisions and query time of DedupIndex vs. get_close_matches (is_similar) for growing idea counts.
+
+Builds synthetic sessions of AUT-style ideas, then checks a mix of near-duplicate and new
+candidates against both. Every decision must be identical; the script exits non-zero otherwise.
+
+Usage: python benchmarks/bench_dedup.py [--counts 10 100 1000 10000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from difflib import get_close_matches
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dedup import DedupIndex, SIMILARITY_THRESHOLD
+
+VERBS = ["use as", "make", "build", "hold", "clean", "pick", "fix", "hang", "reset", "scratch", "open", "turn into", "bend into", "tie"]
+OBJECTS = ["a lock", "paper", "a necklace", "a hook", "your nails", "a phone", "a bookmark", "a zipper", "a key ring", "earrings",
+           "a tiny sculpture", "a cable", "a sim card tray", "a plant support", "a picture", "a fishing hook", "a toothpick", "a money clip"]
+EXTRAS = ["", " together", " for kids", " at home", " in an emergency", " on a trip", " quickly", " with friends"]
+
+
+def is_similar(new_idea, existing_ideas, similarity_threshold=SIMILARITY_THRESHOLD):
+    """Reference implementation (same as idea_extractor.is_similar)."""
+    return len(get_close_matches(new_idea, existing_ideas, n=1, cutoff=similarity_threshold)) > 0
+
+
+def random_idea(rng):
+    return f"{rng.choice(VERBS)} {rng.choice(OBJECTS)}{rng.choice(EXTRAS)}"
+
+
+def perturb(idea, rng):
+    """Returns a near-duplicate: a typo, a dropped word or an added word."""
+    choice = rng.random()
+    if choice < 0.4 and len(idea) > 3:
+        i = rng.randrange(len(idea))
+        return idea[:i] + rng.choice("aeiourstn") + idea[i + 1:]
+    words = idea.split()
+    if choice < 0.7 and len(words) > 2:
+        del words[rng.randrange(len(words))]
+    else:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(["the", "a", "it", "really"]))
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'ideas':>7} {'queries':>8} {'similar':>8} {'mismatches':>10} {'difflib ms/q':>13} {'index ms/q':>11} {'verified/q':>11}")
+    mismatches_total = 0
+    for count in args.counts:
+        rng = random.Random(args.seed)
+        # Numbered ideas, so a session of any size has distinct ideas
+        ideas = [f"{random_idea(rng)} {i}" for i in range(count)]
+        index = DedupIndex()
+        index.add(ideas)
+        queries = [perturb(rng.choice(ideas), rng) if rng.random() < 0.5 else f"{random_idea(rng)} {rng.randrange(2 * count)}"
+                   for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        expected = [is_similar(query, ideas) for query in queries]
+        difflib_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = [index.is_similar(query) for query in queries]
+        index_time = time.perf_counter() - start
+
+        mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+        mismatches_total += mismatches
+        print(f"{count:>7} {len(queries):>8} {sum(expected):>8} {mismatches:>10} "
+              f"{difflib_time / len(queries) * 1000:>13.3f} {index_time / len(queries) * 1000:>11.3f} "
+              f"{index.verified / max(index.queries, 1):>11.1f}")
+
+    if mismatches_total:
+        sys.exit(f"❌ {mismatches_total} decisions differ from get_close_matches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""End-to-end throughput of the session pipeline, replaying archived sessions against local stand-ins.
+
+Each session's transcripts.csv is fed through the real pipeline (extraction, scoring, headless
+rendering, archiving) with the speech, OpenAI and SemDis services replaced by fake_servers.py.
+Reports ideas/sec, per-stage latency, utterance-to-plot latency, the time from each final transcript
+to the first rated idea of its LLM request, and CPU use of the whole process. With --streaming every
+session is also replayed with streamed completions (STREAM_COMPLETIONS), reported in the next row.
+
+Usage: python benchmarks/bench_pipeline.py [--sessions "2025-*"] [--interval 0.5] [--llm-latency 0.8] [--semdis-latency 1.5] [--streaming]
+"""
+import argparse
+import contextlib
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import idea_extractor
+from fake_servers import FakeServiceServer, ArchiveResponder, read_recorded_ideas, read_recorded_ratings
+from sessions import load_sessions, percentile, DATA_FOLDER
+
+
+def replay_session(session, args, streaming=False):
+    """Runs one archived session through the pipeline; returns its measurements."""
+    rating_column, ratings = read_recorded_ratings(session["folder"])
+    responder = ArchiveResponder(read_recorded_ideas(session["folder"]))
+    with tempfile.TemporaryDirectory() as workdir, FakeServiceServer(
+            responder, ratings, rating_column, args.llm_latency, args.semdis_latency, args.jitter) as server:
+        idea_extractor.SPEECH_BACKEND = idea_extractor.LLM_BACKEND = idea_extractor.SCORING_BACKEND = "replay"
+        idea_extractor.REPLAY_SERVER_URL = server.url
+        idea_extractor.REPLAY_TRANSCRIPTS_FILE = os.path.join(session["folder"], "transcripts.csv")
+        idea_extractor.REPLAY_TRANSCRIPT_INTERVAL = args.interval
+        idea_extractor.HEADLESS = True
+        idea_extractor.STREAM_COMPLETIONS = streaming
+        # Fresh cache, so every idea goes through the SemDis stand-in
+        idea_extractor.RATING_CACHE_FILE = os.path.join(workdir, "rating_cache.sqlite3")
+
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            output = sys.stdout if args.verbose else open(os.devnull, "w", encoding="utf-8")
+            with contextlib.redirect_stdout(output):
+                wall, cpu = time.perf_counter(), time.process_time()
+                sessions = idea_extractor.main()
+                wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        finally:
+            os.chdir(cwd)
+
+        archived = glob.glob(os.path.join(workdir, "data", "*"))
+        ideas = read_recorded_ideas(archived[0]) if archived else []
+        stages = {stage.name: stage.durations for stage in sessions[0].pipeline.stages}
+        latencies = sessions[0].latency_tracer.latencies()
+        return {"ideas": len(ideas), "wall": wall, "cpu": cpu, "stages": stages, "total": latencies.get(("idea", "total"), []),
+                "first_rated": latencies.get(("request", "first_rated"), []),
+                "completions": server.completions, "uploads": server.uploads, "session": sessions[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=DATA_FOLDER)
+    parser.add_argument("--sessions", default="*", help="glob of session folder names")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between replayed transcripts")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--semdis-latency", type=float, default=1.5)
+    parser.add_argument("--jitter", type=float, default=0.2, help="latencies vary by up to this fraction")
+    parser.add_argument("--streaming", action="store_true", help="also replay every session with streamed completions")
+    parser.add_argument("--verbose", action="store_true", help="show the session output")
+    args = parser.parse_args()
+
+    sessions = load_sessions(args.data, args.sessions)
+    if not sessions:
+        print(f"No archived sessions with transcripts found in '{args.data}'.")
+        return
+
+    print(f"{'session':<40} {'transcripts':>11} {'ideas':>6} {'ideas/s':>8} {'LLM calls':>9} {'uploads':>8} "
+          f"{'extract p50/p95 s':>17} {'score p50/p95 s':>15} {'first rated p50/p95 s':>21} {'to plot p50/p95 s':>17} "
+          f"{'CPU s':>6} {'CPU %':>6}")
+    print("-" * 178)
+    for session in sessions:
+        for streaming in ((False, True) if args.streaming else (False,)):
+            result = replay_session(session, args, streaming)
+            extraction, scoring = result["stages"]["extraction"], result["stages"]["scoring"]
+            name = session["name"] + (" (streamed)" if streaming else "")
+            print(f"{name:<40} {len(session['transcripts']):>11} {result['ideas']:>6} "
+                  f"{result['ideas'] / result['wall']:>8.2f} {result['completions']:>9} {result['uploads']:>8} "
+                  f"{percentile(extraction, 50):>8.2f}/{percentile(extraction, 95):<8.2f} "
+                  f"{percentile(scoring, 50):>7.2f}/{percentile(scoring, 95):<7.2f} "
+                  f"{percentile(result['first_rated'], 50):>10.2f}/{percentile(result['first_rated'], 95):<10.2f} "
+                  f"{percentile(result['total'], 50):>8.2f}/{percentile(result['total'], 95):<8.2f} "
+                  f"{result['cpu']:>6.1f} {result['cpu'] / result['wall']:>6.0%}")
+
+if __name__ == "__main__":
+    main()
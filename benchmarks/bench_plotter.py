@@ -0,0 +1,84 @@
+"""Frame time of the legacy live_plotter vs. LivePlotRenderer as the number of ideas grows.
+
+Usage: python benchmarks/bench_plotter.py [--frames 20] [--counts 10 100 1000 10000] [--legacy-max 1000]
+
+The legacy plotter re-lays out the whole ideas panel on every frame, so it is only measured up to --legacy-max ideas.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from plotter import live_plotter, LivePlotRenderer
+
+VISUALIZATION_SIZE = 10
+WORDS = ["hold", "paper", "together", "pick", "a", "lock", "make", "jewelry", "clean", "nails", "reset", "phone", "hook"]
+
+
+def make_session(count, seed=0):
+    """Returns random ideas and ratings for a session with count ideas."""
+    rng = random.Random(seed)
+    ideas = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))) + f" {i}" for i in range(count)]
+    ratings = [rng.uniform(0.0, 0.4) for _ in range(count)]
+    return ideas, ratings
+
+
+def frames(ideas, ratings, frame_count):
+    """Yields the arguments of the last frame_count updates of a session, one new idea per frame."""
+    for n in range(len(ideas) - frame_count + 1, len(ideas) + 1):
+        shown_ideas, shown_ratings = ideas[:n], ratings[:n]
+        y_data = (shown_ratings + [0] * VISUALIZATION_SIZE)[:VISUALIZATION_SIZE] if n < VISUALIZATION_SIZE else shown_ratings[-VISUALIZATION_SIZE:]
+        labels = (shown_ideas + [0] * VISUALIZATION_SIZE)[:VISUALIZATION_SIZE] if n < VISUALIZATION_SIZE else shown_ideas[-VISUALIZATION_SIZE:]
+        yield y_data, labels, shown_ideas, shown_ratings
+
+
+def bench_legacy(x_vec, ideas, ratings, frame_count):
+    line = []
+    times = []
+    for y_data, labels, shown_ideas, shown_ratings in frames(ideas, ratings, frame_count):
+        start = time.perf_counter()
+        line = live_plotter(x_vec, y_data, line, shown_ideas, shown_ratings, idea_annotations=labels, t_pause=1e-6)
+        line.figure.canvas.draw()
+        times.append(time.perf_counter() - start)
+    plt.close("all")
+    return times
+
+
+def bench_renderer(x_vec, ideas, ratings, frame_count):
+    renderer = LivePlotRenderer(x_vec, interactive=False)
+    times = []
+    for y_data, labels, shown_ideas, shown_ratings in frames(ideas, ratings, frame_count):
+        start = time.perf_counter()
+        renderer.update(y_data, labels, shown_ideas, shown_ratings)
+        times.append(time.perf_counter() - start)
+    plt.close("all")
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--legacy-max", type=int, default=1000)
+    args = parser.parse_args()
+
+    x_vec = np.linspace(0, 1, VISUALIZATION_SIZE + 1)[0:-1]
+    print(f"{'ideas':>7} {'legacy p50 ms':>14} {'renderer p50 ms':>16} {'renderer p95 ms':>16}")
+    for count in args.counts:
+        ideas, ratings = make_session(max(count, args.frames))
+        legacy = "-"
+        if count <= args.legacy_max:
+            legacy = f"{np.percentile(bench_legacy(x_vec, ideas, ratings, args.frames), 50) * 1000:.1f}"
+        renderer = np.array(bench_renderer(x_vec, ideas, ratings, args.frames)) * 1000
+        print(f"{count:>7} {legacy:>14} {np.percentile(renderer, 50):>16.1f} {np.percentile(renderer, 95):>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
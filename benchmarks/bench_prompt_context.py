@@ -0,0 +1,79 @@
+"""Compares the full idea-history prompt with the retrieval-bounded prompt on archived sessions.
+
+Replays each session's transcripts through the real extraction prompt and LLM, once listing all
+previous ideas and once only the most relevant ones, and reports prompt tokens, LLM latency,
+extracted ideas and recall against the manually extracted ideas in idea_comparison.csv.
+
+Usage: python benchmarks/bench_prompt_context.py [--sessions "2025-*"] [--max-ideas 20] [--max-chars 1000] [--replay]
+Needs the OpenAI credentials of idea_extractor.py, or --replay for the local stand-in (fake_servers.py).
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import idea_extractor
+from idea_extractor import build_prompt, request_completion, parse_ideas, filter_new_ideas, previous_ideas_for_prompt
+from idea_index import IdeaIndex
+from fake_servers import FakeServiceServer, ArchiveResponder, read_recorded_ideas
+from sessions import load_sessions, recall, percentile, DATA_FOLDER
+
+
+def replay(transcripts, bounded):
+    """Runs extraction over a session's transcripts like the live pipeline; returns ideas and per-request stats."""
+    ideas, index = [], IdeaIndex()
+    latencies, prompt_tokens = [], []
+    for i in range(len(transcripts)):
+        latest_transcript = " ".join(transcripts[max(0, i + 1 - idea_extractor.TRANSCRIPT_WINDOW):i + 1])
+        previous_ideas = previous_ideas_for_prompt(latest_transcript, ideas, index if bounded else None)
+        prompt = build_prompt(latest_transcript, previous_ideas)
+        start = time.perf_counter()
+        response = request_completion(prompt)
+        latencies.append(time.perf_counter() - start)
+        prompt_tokens.append(response.usage.prompt_tokens)
+        new_ideas = filter_new_ideas(parse_ideas(response.choices[0].message.content.strip()), ideas)
+        ideas.extend(new_ideas)
+        index.add(new_ideas)
+    return ideas, latencies, prompt_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=DATA_FOLDER)
+    parser.add_argument("--sessions", default="*", help="glob of session folder names")
+    parser.add_argument("--max-ideas", type=int, default=idea_extractor.PROMPT_CONTEXT_MAX_IDEAS)
+    parser.add_argument("--max-chars", type=int, default=idea_extractor.PROMPT_CONTEXT_MAX_CHARS)
+    parser.add_argument("--replay", action="store_true", help="answer with the session's recorded ideas from a local stand-in")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="latency of the stand-in (with --replay)")
+    args = parser.parse_args()
+    idea_extractor.PROMPT_CONTEXT_MAX_IDEAS = args.max_ideas
+    idea_extractor.PROMPT_CONTEXT_MAX_CHARS = args.max_chars
+
+    sessions = load_sessions(args.data, args.sessions)
+    if not sessions:
+        print(f"No archived sessions with transcripts found in '{args.data}'.")
+        return
+
+    print(f"{'session':<40} {'mode':<8} {'requests':>8} {'tokens/req':>10} {'p50 s':>7} {'p95 s':>7} {'ideas':>6} {'recall':>7}")
+    print("-" * 100)
+    for session in sessions:
+        with contextlib.ExitStack() as stack:
+            if args.replay:
+                server = stack.enter_context(FakeServiceServer(ArchiveResponder(read_recorded_ideas(session["folder"])),
+                                                               llm_latency=args.llm_latency))
+                idea_extractor.LLM_BACKEND = "replay"
+                idea_extractor.REPLAY_SERVER_URL = server.url
+                idea_extractor.close_services()
+            for mode, bounded in (("full", False), ("bounded", True)):
+                ideas, latencies, prompt_tokens = replay(session["transcripts"], bounded)
+                session_recall = recall(ideas, session["manual_ideas"])
+                print(f"{session['name']:<40} {mode:<8} {len(latencies):>8} "
+                      f"{sum(prompt_tokens) / max(len(prompt_tokens), 1):>10.0f} "
+                      f"{percentile(latencies, 50):>7.2f} {percentile(latencies, 95):>7.2f} {len(ideas):>6} "
+                      f"{'-' if session_recall is None else f'{session_recall:.2f}':>7}")
+
+
+if __name__ == "__main__":
+    main()
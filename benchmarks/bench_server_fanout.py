@@ -0,0 +1,131 @@
+"""Fan-out latency of session_server.py: time from an event's publication to its arrival at each dashboard.
+
+An archived session's transcripts are posted to a served session at a fixed interval, with the OpenAI and
+SemDis services replaced by fake_servers.py, while N dashboards follow its event stream. Reports the
+delivery latency of the transcript, idea and rating events over all dashboards, for each N.
+The dashboards run in this process, so their latencies include the time the clients wait for the GIL.
+
+Usage: python benchmarks/bench_server_fanout.py [--sessions "2025-*"] [--clients 1,10,100] [--interval 0.2]
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import idea_extractor
+from fake_servers import FakeServiceServer, ArchiveResponder, read_recorded_ideas, read_recorded_ratings
+from session_server import SessionServer
+from sessions import load_sessions, percentile, DATA_FOLDER
+
+
+def follow_events(host, port, session_id, connected, delays):
+    """Reads a session's event stream until it ends, recording each event's delivery delay by type."""
+    connection = http.client.HTTPConnection(host, port)
+    connection.request("GET", f"/sessions/{session_id}/events")
+    response = connection.getresponse()
+    connected.release()
+    event_type = None
+    for line in response:
+        line = line.decode("utf-8").rstrip("\n")
+        if line.startswith("event: "):
+            event_type = line[len("event: "):]
+        elif line.startswith("data: "):
+            event = json.loads(line[len("data: "):])
+            delays.setdefault(event_type, []).append(time.time() - event["time"])
+    connection.close()
+
+
+def post(host, port, path, body=b""):
+    connection = http.client.HTTPConnection(host, port)
+    connection.request("POST", path, body)
+    response = connection.getresponse()
+    content = response.read()
+    connection.close()
+    return json.loads(content) if response.getheader("Content-Type") == "application/json" else None
+
+
+def fan_out(session, clients, args):
+    """Serves one session to clients dashboards; returns the delivery delays by event type and the CPU seconds."""
+    rating_column, ratings = read_recorded_ratings(session["folder"])
+    responder = ArchiveResponder(read_recorded_ideas(session["folder"]))
+    with tempfile.TemporaryDirectory() as workdir, FakeServiceServer(
+            responder, ratings, rating_column, args.llm_latency, args.semdis_latency) as services:
+        idea_extractor.LLM_BACKEND = idea_extractor.SCORING_BACKEND = "replay"
+        idea_extractor.REPLAY_SERVER_URL = services.url
+        # Fresh cache, so every idea goes through the SemDis stand-in
+        idea_extractor.RATING_CACHE_FILE = os.path.join(workdir, "rating_cache.sqlite3")
+
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        output = sys.stdout if args.verbose else open(os.devnull, "w", encoding="utf-8")
+        try:
+            with contextlib.redirect_stdout(output), SessionServer(port=0) as server:
+                host, port = server.url.split("//")[1].split(":")
+                session_id = post(host, port, "/sessions", json.dumps({"participant": "bench"}).encode("utf-8"))["id"]
+                connected = threading.Semaphore(0)
+                delays = [{} for _ in range(clients)]
+                readers = [threading.Thread(target=follow_events, args=(host, port, session_id, connected, client_delays), daemon=True)
+                           for client_delays in delays]
+                for reader in readers:
+                    reader.start()
+                for _ in readers:
+                    connected.acquire()
+
+                cpu = time.process_time()
+                for transcript in session["transcripts"][:args.transcripts]:
+                    post(host, port, f"/sessions/{session_id}/transcripts", transcript.encode("utf-8"))
+                    time.sleep(args.interval)
+                post(host, port, f"/sessions/{session_id}/stop")
+                for reader in readers:
+                    reader.join()
+                cpu = time.process_time() - cpu
+        finally:
+            os.chdir(cwd)
+
+    merged = {}
+    for client_delays in delays:
+        for event_type, values in client_delays.items():
+            merged.setdefault(event_type, []).extend(values)
+    return merged, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=DATA_FOLDER)
+    parser.add_argument("--sessions", default="*", help="glob of session folder names; the first one is served")
+    parser.add_argument("--clients", default="1,10,100", help="comma-separated numbers of dashboards")
+    parser.add_argument("--transcripts", type=int, default=20, help="transcripts posted per run")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between posted transcripts")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--semdis-latency", type=float, default=0.3)
+    parser.add_argument("--verbose", action="store_true", help="show the server output")
+    args = parser.parse_args()
+
+    sessions = load_sessions(args.data, args.sessions)
+    if not sessions:
+        print(f"No archived sessions with transcripts found in '{args.data}'.")
+        return
+    session = sessions[0]
+    print(f"Serving {session['name']}: {min(args.transcripts, len(session['transcripts']))} transcripts every {args.interval} s\n")
+
+    print(f"{'dashboards':>10} {'events':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'transcript p95':>14} {'idea p95':>9} {'rating p95':>10} {'CPU s':>6}")
+    print("-" * 100)
+    for clients in (int(value) for value in args.clients.split(",")):
+        delays, cpu = fan_out(session, clients, args)
+        everything = [delay * 1000 for values in delays.values() for delay in values]
+        by_type = {event_type: percentile([delay * 1000 for delay in delays.get(event_type, [])], 95)
+                   for event_type in ("transcript", "idea", "rating")}
+        print(f"{clients:>10} {len(everything) // clients:>7} {percentile(everything, 50):>8.1f} "
+              f"{percentile(everything, 95):>8.1f} {percentile(everything, 99):>8.1f} {max(everything, default=0):>8.1f} "
+              f"{by_type['transcript']:>14.1f} {by_type['idea']:>9.1f} {by_type['rating']:>10.1f} {cpu:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
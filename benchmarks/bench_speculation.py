@@ -0,0 +1,62 @@
+"""Latency saved and LLM calls wasted by speculative extraction on stable interim transcripts.
+
+Replays archived sessions through the full pipeline against fake_servers.py, once extracting only from
+final transcripts and once with SPECULATIVE_EXTRACTION. The replayed speech recognition gives each
+transcript as an interim response --finalization-delay seconds before its final result, split like
+Google's into a stable result and an unstable last word, so the speculation is extended by the final
+result. It revises the last stable word of a share --revision-rate of them, so some speculative requests
+are wasted.
+
+Usage: python benchmarks/bench_speculation.py [--sessions "2025-*"] [--finalization-delay 0.8] [--revision-rate 0.2]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import idea_extractor
+from bench_pipeline import replay_session
+from sessions import load_sessions, percentile, DATA_FOLDER
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=DATA_FOLDER)
+    parser.add_argument("--sessions", default="*", help="glob of session folder names")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between replayed transcripts")
+    parser.add_argument("--finalization-delay", type=float, default=0.8,
+                        help="seconds each transcript is a stable interim result before it is final")
+    parser.add_argument("--revision-rate", type=float, default=0.2, help="share of interim results revised in the final one")
+    parser.add_argument("--min-stability", type=float, default=idea_extractor.SPECULATION_MIN_STABILITY)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--semdis-latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2, help="latencies vary by up to this fraction")
+    parser.add_argument("--verbose", action="store_true", help="show the session output")
+    args = parser.parse_args()
+    idea_extractor.REPLAY_FINALIZATION_DELAY = args.finalization_delay
+    idea_extractor.REPLAY_REVISION_RATE = args.revision_rate
+    idea_extractor.SPECULATION_MIN_STABILITY = args.min_stability
+
+    sessions = load_sessions(args.data, args.sessions)
+    if not sessions:
+        print(f"No archived sessions with transcripts found in '{args.data}'.")
+        return
+
+    print(f"{'session':<45} {'ideas':>6} {'LLM calls':>9} {'first rated p50/p95 s':>21} {'to plot p50/p95 s':>17} "
+          f"{'speculative':>11} {'reused':>7} {'extended':>8} {'wasted':>7} {'saved p50 s':>11}")
+    print("-" * 152)
+    for session in sessions:
+        for speculative in (False, True):
+            idea_extractor.SPECULATIVE_EXTRACTION = speculative
+            result = replay_session(session, args)
+            name = session["name"] + (" (speculative)" if speculative else "")
+            tracker = result["session"].speculation
+            stats = tracker.stats() if tracker is not None else {"started": 0, "reused": 0, "extended": 0, "wasted": 0, "saved_p50": 0.0}
+            print(f"{name:<45} {result['ideas']:>6} {result['completions']:>9} "
+                  f"{percentile(result['first_rated'], 50):>10.2f}/{percentile(result['first_rated'], 95):<10.2f} "
+                  f"{percentile(result['total'], 50):>8.2f}/{percentile(result['total'], 95):<8.2f} "
+                  f"{stats['started']:>11} {stats['reused']:>7} {stats['extended']:>8} {stats['wasted']:>7} {stats['saved_p50']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
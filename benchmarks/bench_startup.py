@@ -0,0 +1,44 @@
+"""Import time of idea_extractor.py with lazy vs. eager imports of its heavy dependencies.
+
+Each run imports the module in a fresh interpreter. "eager" also imports the dependencies the
+module used to load at import (matplotlib via plotter, pandas, OpenAI, Google Cloud Speech, PyAudio),
+which a session now imports where they are first used, in parallel with the other startup steps.
+The startup steps of a real session are printed by idea_extractor.py itself ("🚀 Startup: ...").
+
+Usage: python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from sessions import percentile
+
+EAGER_MODULES = ["plotter", "pandas", "openai", "google.cloud.speech", "google.oauth2.service_account", "pyaudio"]
+
+
+def import_seconds(modules):
+    """Imports modules in a fresh interpreter; returns the seconds it took."""
+    code = ("import time; start = time.perf_counter()\n"
+            + "".join(f"import {module}\n" for module in modules)
+            + "print(time.perf_counter() - start)")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'imports':<10} {'p50 (s)':>9} {'min (s)':>9} {'max (s)':>9}")
+    for name, modules in (("lazy", ["idea_extractor"]), ("eager", ["idea_extractor"] + EAGER_MODULES)):
+        times = [import_seconds(modules) for _ in range(args.runs)]
+        print(f"{name:<10} {percentile(times, 50):>9.3f} {min(times):>9.3f} {max(times):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compares transcript window strategies on archived sessions.
+
+Replays each session's transcripts with one extraction request per transcript (as when the LLM
+keeps up with the speaker) for every strategy, and reports the transcript tokens and prompt tokens
+sent, LLM latency, extracted ideas and recall against the manually extracted ideas in idea_comparison.csv.
+
+Usage: python benchmarks/bench_transcript_windows.py [--sessions "2025-*"] [--replay]
+Needs the OpenAI credentials of idea_extractor.py, or --replay for the local stand-in (fake_servers.py).
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import idea_extractor
+from idea_extractor import build_prompt, request_completion, parse_ideas, filter_new_ideas, previous_ideas_for_prompt
+from idea_index import IdeaIndex
+from dedup import DedupIndex
+from fake_servers import FakeServiceServer, ArchiveResponder, read_recorded_ideas
+from transcript_windows import LastNWindow, TokenBudgetWindow, SinceExtractionWindow, OverlapWindow, estimate_tokens
+from sessions import load_sessions, recall, percentile, DATA_FOLDER
+
+
+def strategies():
+    return [LastNWindow(4), LastNWindow(1), TokenBudgetWindow(150), SinceExtractionWindow(8), OverlapWindow(1)]
+
+
+def replay(transcripts, window):
+    """Runs extraction over a session's transcripts with a window strategy; returns ideas and per-request stats."""
+    ideas, index, dedup_index = [], IdeaIndex(), DedupIndex()
+    latencies, prompt_tokens, transcript_tokens = [], [], []
+    for i in range(len(transcripts)):
+        selected = window.select(transcripts[:i + 1], 1)
+        latest_transcript = " ".join(selected)
+        prompt = build_prompt(latest_transcript, previous_ideas_for_prompt(latest_transcript, ideas, index))
+        start = time.perf_counter()
+        response = request_completion(prompt)
+        latencies.append(time.perf_counter() - start)
+        prompt_tokens.append(response.usage.prompt_tokens)
+        transcript_tokens.append(estimate_tokens(latest_transcript))
+        new_ideas = filter_new_ideas(parse_ideas(response.choices[0].message.content.strip()), ideas, dedup_index)
+        window.extracted(i + 1, bool(new_ideas))
+        ideas.extend(new_ideas)
+        index.add(new_ideas)
+        dedup_index.add(new_ideas)
+    return ideas, latencies, prompt_tokens, transcript_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=DATA_FOLDER)
+    parser.add_argument("--sessions", default="*", help="glob of session folder names")
+    parser.add_argument("--replay", action="store_true", help="answer with the session's recorded ideas from a local stand-in")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="latency of the stand-in (with --replay)")
+    args = parser.parse_args()
+
+    sessions = load_sessions(args.data, args.sessions)
+    if not sessions:
+        print(f"No archived sessions with transcripts found in '{args.data}'.")
+        return
+
+    print(f"{'session':<40} {'strategy':<20} {'requests':>8} {'transcript tok':>14} {'prompt tok':>10} "
+          f"{'p50 s':>7} {'p95 s':>7} {'ideas':>6} {'recall':>7}")
+    print("-" * 127)
+    for session in sessions:
+        with contextlib.ExitStack() as stack:
+            if args.replay:
+                server = stack.enter_context(FakeServiceServer(ArchiveResponder(read_recorded_ideas(session["folder"])),
+                                                               llm_latency=args.llm_latency))
+                idea_extractor.LLM_BACKEND = "replay"
+                idea_extractor.REPLAY_SERVER_URL = server.url
+                idea_extractor.close_services()
+            for window in strategies():
+                with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+                    ideas, latencies, prompt_tokens, transcript_tokens = replay(session["transcripts"], window)
+                session_recall = recall(ideas, session["manual_ideas"])
+                print(f"{session['name']:<40} {repr(window):<20} {len(latencies):>8} {sum(transcript_tokens):>14} "
+                      f"{sum(prompt_tokens):>10} {percentile(latencies, 50):>7.2f} {percentile(latencies, 95):>7.2f} "
+                      f"{len(ideas):>6} {'-' if session_recall is None else f'{session_recall:.2f}':>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Helpers for benchmarks that replay archived sessions from data/."""
+import csv
+import glob
+import os
+import sys
+from difflib import get_close_matches
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+from fake_servers import read_transcripts
+DATA_FOLDER = os.path.join(REPO_ROOT, "data")
+# Fuzzy-match cutoff for counting a manually extracted idea as found
+RECALL_CUTOFF = 0.6
+
+
+def read_manual_ideas(path):
+    """Reads the 'manually extracted ideas' column of an idea_comparison.csv."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        reader = csv.DictReader(file)
+        return [row["manually extracted ideas"].strip() for row in reader
+                if (row.get("manually extracted ideas") or "").strip()]
+
+
+def load_sessions(data_folder=DATA_FOLDER, pattern="*"):
+    """Returns archived sessions that have transcripts, with their manually extracted ideas if coded."""
+    sessions = []
+    for folder in sorted(glob.glob(os.path.join(data_folder, pattern))):
+        transcripts_path = os.path.join(folder, "transcripts.csv")
+        if not os.path.exists(transcripts_path):
+            continue
+        sessions.append({
+            "name": os.path.basename(folder),
+            "folder": folder,
+            "transcripts": read_transcripts(transcripts_path),
+            "manual_ideas": read_manual_ideas(os.path.join(folder, "idea_comparison.csv")),
+        })
+    return sessions
+
+
+def recall(extracted_ideas, manual_ideas, cutoff=RECALL_CUTOFF):
+    """Fraction of manually extracted ideas that have a fuzzy match among the extracted ones (None if not coded)."""
+    if not manual_ideas:
+        return None
+    extracted = [idea.lower() for idea in extracted_ideas]
+    found = sum(1 for idea in manual_ideas if get_close_matches(idea.lower(), extracted, n=1, cutoff=cutoff))
+    return found / len(manual_ideas)
+
+
+def percentile(values, q):
+    """Returns the q-th percentile of values (0 for no values)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
@@ -0,0 +1,87 @@
+import argparse
+import csv
+import glob
+import os
+import numpy as np
+from scipy import stats
+from semdis_local import LocalSemDisScorer
+
+DATA_FOLDER = "data"
+RATINGS_FILENAME = "ratings.csv"
+
+
+def read_archived_ratings(path, column=None):
+    """Reads (item, response, rating) triples from an archived ratings.csv."""
+    with open(path, "r", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        # Third column holds the rating unless a column is named
+        rating_index = header.index(column) if column else 2
+        triples = []
+        for row in reader:
+            if len(row) <= rating_index:
+                continue
+            try:
+                triples.append((row[0], row[1], float(row[rating_index])))
+            except ValueError:
+                continue
+        return triples
+
+
+def agreement(remote, local):
+    """Returns agreement statistics between remote and local ratings, ignoring unscoreable responses."""
+    remote = np.asarray(remote, dtype=np.float64)
+    local = np.asarray(local, dtype=np.float64)
+    valid = ~np.isnan(local)
+    remote, local = remote[valid], local[valid]
+    result = {"n": int(valid.sum()), "skipped": int((~valid).sum()), "pearson": np.nan, "spearman": np.nan, "mae": np.nan}
+    if len(remote) >= 1:
+        result["mae"] = float(np.mean(np.abs(remote - local)))
+    if len(remote) >= 3 and np.std(remote) > 0 and np.std(local) > 0:
+        result["pearson"] = float(stats.pearsonr(remote, local)[0])
+        result["spearman"] = float(stats.spearmanr(remote, local)[0])
+    return result
+
+
+def print_agreement(name, result):
+    print(f"{name:<45} {result['n']:>5} {result['skipped']:>7} {result['pearson']:>8.3f} {result['spearman']:>9.3f} {result['mae']:>7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares local semantic-distance scores with archived SemDis ratings.")
+    parser.add_argument("vectors", help="word-vector file used by the local scorer")
+    parser.add_argument("--data", default=DATA_FOLDER, help="folder with archived sessions (default: data)")
+    parser.add_argument("--column", default=None, help="SemDis column to compare with (default: third column)")
+    parser.add_argument("--composition", default="multiply", choices=["multiply", "add"])
+    args = parser.parse_args()
+
+    scorer = LocalSemDisScorer(args.vectors, composition=args.composition)
+    paths = sorted(glob.glob(os.path.join(args.data, "*", RATINGS_FILENAME)))
+    if not paths:
+        print(f"No archived {RATINGS_FILENAME} files found in '{args.data}'.")
+        return
+
+    print(f"{'session':<45} {'n':>5} {'skipped':>7} {'pearson':>8} {'spearman':>9} {'mae':>7}")
+    print("-" * 86)
+    all_remote, all_local = [], []
+    for path in paths:
+        triples = read_archived_ratings(path, args.column)
+        if not triples:
+            continue
+        try:
+            _, rows = scorer.rate((item, response) for item, response, _ in triples)
+        except ValueError as e:
+            print(f"⚠️ Skipping {path}: {e}")
+            continue
+        remote = [rating for _, _, rating in triples]
+        local = [float("nan") if row[2] == "NA" else float(row[2]) for row in rows]
+        all_remote.extend(remote)
+        all_local.extend(local)
+        print_agreement(os.path.basename(os.path.dirname(path)), agreement(remote, local))
+
+    print("-" * 86)
+    print_agreement("all sessions", agreement(all_remote, all_local))
+
+
+if __name__ == "__main__":
+    main()
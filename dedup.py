@@ -0,0 +1,145 @@
+import threading
+from difflib import SequenceMatcher, get_close_matches
+import numpy as np
+from semdis_local import LocalSemDisScorer
+
+SIMILARITY_THRESHOLD = 0.8
+# Cosine similarity of averaged word vectors above which two ideas count as paraphrases
+SEMANTIC_SIMILARITY_THRESHOLD = 0.85
+# Characters are counted in this many hashed buckets; merging characters only loosens the bound, it never drops a match
+CHAR_BUCKETS = 64
+
+
+def _char_counts(text, buckets=CHAR_BUCKETS):
+    counts = np.zeros(buckets, dtype=np.int32)
+    for char in text:
+        counts[ord(char) % buckets] += 1
+    return counts
+
+
+class DedupIndex:
+    """
+    Incremental near-duplicate index with the same decisions as difflib.get_close_matches(..., cutoff=0.8).
+
+    Candidates are generated from character counts: the length ratio and the shared character
+    counts are upper bounds of SequenceMatcher.ratio() (what real_quick_ratio and quick_ratio
+    compute), evaluated for all indexed ideas at once with NumPy. Only the few ideas whose bounds
+    reach the threshold are verified with SequenceMatcher, most promising first.
+    """
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, capacity=256, semantic=None):
+        self.threshold = threshold
+        # Optional SemanticDedupIndex that also rejects paraphrases
+        self.semantic = semantic
+        self.ideas = []
+        self._lengths = np.zeros(capacity, dtype=np.int64)
+        self._counts = np.zeros((capacity, CHAR_BUCKETS), dtype=np.int32)
+        self._lock = threading.Lock()
+        # Counters
+        self.queries = 0
+        self.verified = 0
+
+    def __len__(self):
+        return len(self.ideas)
+
+    def add(self, ideas):
+        """Adds accepted ideas to the index."""
+        with self._lock:
+            for idea in ideas:
+                count = len(self.ideas)
+                if count == len(self._lengths):
+                    # Grow geometrically so adding stays amortized O(1)
+                    self._lengths = np.concatenate((self._lengths, np.zeros_like(self._lengths)))
+                    self._counts = np.concatenate((self._counts, np.zeros_like(self._counts)))
+                self._lengths[count] = len(idea)
+                self._counts[count] = _char_counts(idea)
+                self.ideas.append(idea)
+        if self.semantic is not None:
+            self.semantic.add(ideas)
+
+    def candidates(self, idea):
+        """Returns the indexed ideas whose upper bounds reach the threshold, highest bound first."""
+        length = len(idea)
+        with self._lock:
+            count = len(self.ideas)
+            lengths = self._lengths[:count]
+            totals = lengths + length
+            with np.errstate(invalid="ignore", divide="ignore"):
+                # Two empty strings are identical (ratio 1.0)
+                length_bound = np.where(totals > 0, 2.0 * np.minimum(lengths, length) / totals, 1.0)
+                rows = np.flatnonzero(length_bound >= self.threshold)
+                shared = np.minimum(self._counts[rows], _char_counts(idea)).sum(axis=1)
+                bound = np.where(totals[rows] > 0, 2.0 * shared / totals[rows], 1.0)
+            passed = bound >= self.threshold
+            rows, bound = rows[passed], bound[passed]
+            order = np.argsort(-bound, kind="stable")
+            return [self.ideas[i] for i in rows[order]]
+
+    def is_similar(self, idea, pending=()):
+        """Checks if an idea is similar to any indexed idea or to any of the pending (not yet indexed) ideas."""
+        if pending and get_close_matches(idea, list(pending), n=1, cutoff=self.threshold):
+            return True
+        if self._is_close_match(idea):
+            return True
+        return self.semantic is not None and self.semantic.is_similar(idea, pending)
+
+    def _is_close_match(self, idea):
+        self.queries += 1
+        matcher = SequenceMatcher()
+        # Same argument order as get_close_matches: the new idea is seq2, the known idea seq1
+        matcher.set_seq2(idea)
+        for candidate in self.candidates(idea):
+            self.verified += 1
+            matcher.set_seq1(candidate)
+            if matcher.ratio() >= self.threshold:
+                return True
+        return False
+
+
+class SemanticDedupIndex:
+    """
+    Paraphrase check on averaged word vectors ("build a house" ≈ "construct a building").
+
+    Accepted ideas are kept as a growing array of unit vectors, so a candidate is compared with
+    all of them in one matrix-vector product. Works offline with the local word-vector model.
+    """
+    def __init__(self, vectors, threshold=SEMANTIC_SIMILARITY_THRESHOLD, capacity=256):
+        # Additive composition of the word vectors is their (unnormalized) average
+        self._composer = LocalSemDisScorer(vectors, composition="add")
+        self.threshold = threshold
+        self._count = 0
+        self._matrix = np.zeros((capacity, self._composer.vectors.dim), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        """Returns one unit vector per text; texts without known words get a zero row."""
+        matrix = np.nan_to_num(self._composer.compose(list(texts)), nan=0.0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def add(self, ideas):
+        """Adds accepted ideas to the index."""
+        ideas = list(ideas)
+        if not ideas:
+            return
+        vectors = self.embed(ideas)
+        with self._lock:
+            needed = self._count + len(ideas)
+            if needed > len(self._matrix):
+                grown = np.zeros((max(needed, 2 * len(self._matrix)), self._matrix.shape[1]), dtype=np.float32)
+                grown[:self._count] = self._matrix[:self._count]
+                self._matrix = grown
+            self._matrix[self._count:needed] = vectors
+            self._count = needed
+
+    def is_similar(self, idea, pending=()):
+        """Checks if an idea is a paraphrase of an indexed idea or of one of the pending ideas."""
+        vector = self.embed([idea])[0]
+        if not vector.any():
+            return False
+        with self._lock:
+            scores = self._matrix[:self._count] @ vector
+        if len(scores) and scores.max() >= self.threshold:
+            return True
+        if pending:
+            return bool((self.embed(pending) @ vector).max() >= self.threshold)
+        return False
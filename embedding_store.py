@@ -0,0 +1,190 @@
+import argparse
+import bisect
+import json
+import mmap
+import struct
+import numpy as np
+
+# File layout of a .semvec store:
+#   magic | header length (uint64) | JSON header | sorted vocabulary | word offsets | row ids | float16 matrix
+# The vocabulary is stored sorted so words can be found by binary search directly in the mapped file,
+# and the matrix starts on a page boundary so only pages of words that are looked up are read.
+MAGIC = b"SEMVEC01"
+PAGE_SIZE = 4096
+STORE_EXTENSION = ".semvec"
+
+
+def read_text_vectors(path):
+    """Yields (word, vector) from a text vector file (GloVe, or word2vec/fastText text with a header line)."""
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        for line_number, line in enumerate(file):
+            parts = line.rstrip().split(" ")
+            if line_number == 0 and len(parts) == 2:
+                # word2vec header line
+                continue
+            if len(parts) < 3:
+                continue
+            yield parts[0], np.asarray(parts[1:], dtype=np.float32)
+
+
+def read_word2vec_binary(path):
+    """Yields (word, vector) from a binary word2vec file."""
+    with open(path, "rb") as file:
+        count, dim = (int(value) for value in file.readline().split())
+        row_bytes = 4 * dim
+        for _ in range(count):
+            word = bytearray()
+            while True:
+                char = file.read(1)
+                if char == b" " or not char:
+                    break
+                # Some writers put a newline after each vector
+                if char != b"\n":
+                    word += char
+            vector = np.frombuffer(file.read(row_bytes), dtype="<f4")
+            yield word.decode("utf-8", errors="replace"), vector
+
+
+def _pad(file):
+    """Pads the file with zeros up to the next page boundary."""
+    remainder = file.tell() % PAGE_SIZE
+    if remainder:
+        file.write(b"\0" * (PAGE_SIZE - remainder))
+
+
+def convert(source, destination, binary=False, normalize=False):
+    """Converts a text or word2vec binary vector file into a memory-mappable .semvec store."""
+    words, rows = [], []
+    seen = set()
+    for word, vector in (read_word2vec_binary(source) if binary else read_text_vectors(source)):
+        # Keep the first vector if a word is listed twice
+        if word in seen:
+            continue
+        seen.add(word)
+        if normalize:
+            vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        words.append(word)
+        rows.append(vector.astype(np.float16))
+    if not rows:
+        raise ValueError(f"No vectors found in '{source}'.")
+    matrix = np.vstack(rows)
+
+    # Sort the vocabulary and remember where each word's row is in the matrix
+    order = sorted(range(len(words)), key=lambda i: words[i].encode("utf-8"))
+    encoded = [words[i].encode("utf-8") for i in order]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(word) for word in encoded])
+    row_ids = np.asarray(order, dtype="<u4")
+
+    header = {"count": len(words), "dim": int(matrix.shape[1]), "dtype": "float16", "normalized": normalize}
+    with open(destination, "wb") as file:
+        # Reserve room for the header, the offsets are filled in once all sections are written
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_size = len(header_bytes) + 256
+        file.write(MAGIC + struct.pack("<Q", header_size) + b" " * header_size)
+        header["vocab_offset"] = file.tell()
+        file.write(b"".join(encoded))
+        _pad(file)
+        header["offsets_offset"] = file.tell()
+        file.write(offsets.tobytes())
+        header["row_ids_offset"] = file.tell()
+        file.write(row_ids.tobytes())
+        _pad(file)
+        header["matrix_offset"] = file.tell()
+        file.write(matrix.astype("<f2").tobytes())
+        file.seek(len(MAGIC) + 8)
+        file.write(json.dumps(header).encode("utf-8").ljust(header_size))
+    return header
+
+
+class _SortedVocabulary:
+    """Sequence view of the sorted vocabulary inside the mapped file, for binary search."""
+    def __init__(self, buffer, vocab_offset, offsets):
+        self._buffer = buffer
+        self._vocab_offset = vocab_offset
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        start = self._vocab_offset + int(self._offsets[i])
+        end = self._vocab_offset + int(self._offsets[i + 1])
+        return self._buffer[start:end]
+
+
+class MappedWordVectors:
+    """Word vectors read through mmap from a .semvec store; pages are shared between processes."""
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a {STORE_EXTENSION} embedding store.")
+        # Lookups are scattered, read-ahead would only pull in unused rows
+        if hasattr(self._mmap, "madvise") and hasattr(mmap, "MADV_RANDOM"):
+            self._mmap.madvise(mmap.MADV_RANDOM)
+
+        header_size = struct.unpack_from("<Q", self._mmap, len(MAGIC))[0]
+        start = len(MAGIC) + 8
+        self.header = json.loads(bytes(self._mmap[start:start + header_size]).decode("utf-8"))
+        count, self.dim = self.header["count"], self.header["dim"]
+        self.normalized = self.header["normalized"]
+
+        offsets = np.frombuffer(self._mmap, dtype="<u8", count=count + 1, offset=self.header["offsets_offset"])
+        self._row_ids = np.frombuffer(self._mmap, dtype="<u4", count=count, offset=self.header["row_ids_offset"])
+        self._vocabulary = _SortedVocabulary(self._mmap, self.header["vocab_offset"], offsets)
+        self.matrix = np.frombuffer(self._mmap, dtype="<f2", count=count * self.dim,
+                                    offset=self.header["matrix_offset"]).reshape(count, self.dim)
+        # Looked up words, including misses (None)
+        self._lookups = {}
+
+    def lookup(self, word):
+        """Returns the matrix row of a word, or None if it is not in the vocabulary."""
+        if word in self._lookups:
+            return self._lookups[word]
+        encoded = word.encode("utf-8")
+        position = bisect.bisect_left(self._vocabulary, encoded)
+        row = None
+        if position < len(self._vocabulary) and self._vocabulary[position] == encoded:
+            row = int(self._row_ids[position])
+        self._lookups[word] = row
+        return row
+
+    def __contains__(self, word):
+        return self.lookup(word) is not None
+
+    def indices(self, words):
+        """Returns the rows of the known words, skipping unknown ones."""
+        rows = (self.lookup(word) for word in words)
+        return [row for row in rows if row is not None]
+
+    def rows(self, indices):
+        """Returns the vectors for the given rows as float32."""
+        return self.matrix[indices].astype(np.float32)
+
+    def close(self):
+        # Arrays viewing the map must be released before it can be closed
+        self.matrix = self._row_ids = self._vocabulary = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Converts a word-vector file into a memory-mapped {STORE_EXTENSION} store.")
+    parser.add_argument("source", help="text (GloVe/word2vec/fastText) or binary word2vec vector file")
+    parser.add_argument("destination", help=f"output file, e.g. vectors{STORE_EXTENSION}")
+    parser.add_argument("--binary", action="store_true", help="source is in binary word2vec format")
+    parser.add_argument("--normalize", action="store_true", help="store unit-length rows")
+    args = parser.parse_args()
+
+    header = convert(args.source, args.destination, binary=args.binary, normalize=args.normalize)
+    print(f"✅ Wrote {header['count']} vectors of dimension {header['dim']} to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
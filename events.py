@@ -0,0 +1,71 @@
+import threading
+
+
+class UpdateChannel:
+    """In-process channel that hands the latest published value to any number of consumers.
+
+    Each consumer remembers the version it saw last. A consumer that falls behind gets only the
+    newest value, so slow consumers skip intermediate updates instead of building up a backlog.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._version = 0
+        self._value = None
+
+    def publish(self, value):
+        """Makes value the latest update and wakes up all waiting consumers."""
+        with self._condition:
+            self._version += 1
+            self._value = value
+            self._condition.notify_all()
+            return self._version
+
+    def wait(self, last_version, timeout=None):
+        """Waits for an update newer than last_version.
+
+        Returns (version, value), or (last_version, None) if the timeout passed without an update.
+        """
+        with self._condition:
+            if self._condition.wait_for(lambda: self._version > last_version, timeout):
+                return self._version, self._value
+            return last_version, None
+
+    def latest(self):
+        """Returns the current (version, value) without waiting."""
+        with self._condition:
+            return self._version, self._value
+
+
+class EventLog:
+    """Append-only list of events that any number of consumers read from their own position.
+
+    Unlike UpdateChannel, every consumer gets every event in order. Consumers only keep an index,
+    so adding one costs no queue, and a consumer that joins late reads the history first.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._events = []
+        self._closed = False
+
+    def append(self, event):
+        """Adds an event and wakes up all waiting consumers; returns its position."""
+        with self._condition:
+            self._events.append(event)
+            self._condition.notify_all()
+            return len(self._events) - 1
+
+    def read(self, position, timeout=None):
+        """Waits for events from position on; returns (events, closed). No events means timeout or closed."""
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._events) > position or self._closed, timeout)
+            return self._events[position:], self._closed
+
+    def close(self):
+        """Marks the end of the events; consumers get the remaining events and then closed=True."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._events)
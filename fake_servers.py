@@ -0,0 +1,441 @@
+"""Local stand-ins for the speech, OpenAI and SemDis services, replaying a recorded session.
+
+FakeServiceServer speaks the OpenAI chat completions API (also streamed) and the SemDis upload/download flow
+over HTTP, so the real clients can be pointed at it. ReplaySpeechClient replays an archived
+transcripts.csv in place of Google Cloud Speech. All of them answer after a configurable latency.
+
+Usage: python fake_servers.py --session data/<session folder> [--port 8765] [--llm-latency 0.8] [--semdis-latency 1.5]
+"""
+import argparse
+import csv
+import email.parser
+import email.policy
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from audio_buffer import BufferedAudioStream
+from semdis_api import parse_ratings
+from semdis_local import tokenize
+
+DEFAULT_PORT = 8765
+# Column name of ratings made up for responses that were never rated in the recorded session
+REPLAY_RATING_COLUMN = "SemDis_replay"
+# Share of the LLM latency before the first streamed token (prompt processing); the rest is spread over the tokens
+FIRST_TOKEN_SHARE = 0.3
+# Stability of the interim results ahead of a transcript's final result: all but its last word are stable,
+# the last word is an unstable tail, as Google splits interim results
+STABLE_INTERIM_STABILITY = 0.9
+UNSTABLE_INTERIM_STABILITY = 0.01
+# Share of a recorded idea's words that must occur in the transcript for the stand-in LLM to extract it
+IDEA_WORD_COVERAGE = 0.5
+
+_TRANSCRIPT_PATTERN = re.compile(r"from the following text:\n(.*?)\n\nInstructions:", re.DOTALL)
+_PREVIOUS_IDEAS_PATTERN = re.compile(r"Compare with previous ideas:\n(.*?)\n", re.DOTALL)
+
+
+def read_transcripts(path):
+    """Reads an archived transcripts.csv (one transcript per row, no header)."""
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        return [row[0] for row in csv.reader(file) if row and row[0].strip()]
+
+
+def read_recorded_ideas(session_folder):
+    """Reads the ideas extracted in a recorded session from its idea_pairs.csv."""
+    path = os.path.join(session_folder, "idea_pairs.csv")
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        return [row[1] for row in reader if len(row) >= 2 and row[1].strip()]
+
+
+def read_recorded_ratings(session_folder):
+    """Reads the SemDis ratings of a recorded session; returns (rating column name, {response: rating})."""
+    path = os.path.join(session_folder, "ratings.csv")
+    if not os.path.exists(path):
+        return REPLAY_RATING_COLUMN, {}
+    with open(path, "rb") as file:
+        header, rows = parse_ratings(file.read())
+    if len(header) < 3:
+        return REPLAY_RATING_COLUMN, {}
+    return header[2], {row[1].lower(): row[2] for row in rows if len(row) >= 3}
+
+
+class ArchiveResponder:
+    """Answers extraction prompts with the recorded ideas that are mentioned in the prompt's transcript."""
+    def __init__(self, ideas):
+        self.ideas = [(idea, set(tokenize(idea))) for idea in dict.fromkeys(ideas)]
+
+    def __call__(self, prompt):
+        transcript = _TRANSCRIPT_PATTERN.search(prompt)
+        previous = _PREVIOUS_IDEAS_PATTERN.search(prompt)
+        words = set(tokenize(transcript.group(1) if transcript else prompt, remove_stopwords=False))
+        known = {idea.strip().lower() for idea in previous.group(1).split(",")} if previous else set()
+        found = [idea for idea, idea_words in self.ideas
+                 if idea.lower() not in known and idea_words
+                 and len(idea_words & words) >= IDEA_WORD_COVERAGE * len(idea_words)]
+        return "New Ideas: " + ("; ".join(found) if found else "none")
+
+
+class FakeServiceServer:
+    """
+    HTTP stand-in for the OpenAI chat completions endpoint and the SemDis website.
+
+    Parameters:
+    - responder (callable): responder(prompt) -> answer text of the LLM
+    - ratings (dict, optional): Recorded ratings by lowercased response; others get a stable made-up rating
+    - rating_column (str, optional): Name of the rating column in the downloaded CSV
+    - llm_latency, semdis_latency (float, optional): Seconds before answering a completion / an upload
+    - jitter (float, optional): Latencies vary uniformly by up to this fraction
+    - port (int, optional): 0 picks a free port
+    """
+    def __init__(self, responder, ratings=None, rating_column=REPLAY_RATING_COLUMN,
+                 llm_latency=0.8, semdis_latency=1.5, jitter=0.0, host="127.0.0.1", port=0):
+        self.responder = responder
+        self.ratings = ratings or {}
+        self.rating_column = rating_column
+        self.llm_latency = llm_latency
+        self.semdis_latency = semdis_latency
+        self.jitter = jitter
+        # SemDis keeps the last upload per session cookie
+        self._uploads = {}
+        self._lock = threading.Lock()
+        # Counters
+        self.completions = 0
+        self.uploads = 0
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, type, value, traceback):
+        self.stop()
+
+    def _sleep(self, latency):
+        if latency > 0:
+            time.sleep(latency * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def rating(self, response):
+        recorded = self.ratings.get(response.lower())
+        if recorded is not None:
+            return recorded
+        # Stable across runs, so repeated benchmarks rate the same response the same way
+        return f"{0.5 + (zlib.crc32(response.lower().encode('utf-8')) % 1000) / 2000:.4f}"
+
+    def complete(self, request):
+        """Returns a chat completion for an OpenAI request body."""
+        prompt = request["messages"][-1]["content"]
+        self._sleep(self.llm_latency)
+        answer = self.responder(prompt)
+        with self._lock:
+            self.completions += 1
+        prompt_tokens = sum(len(message["content"]) for message in request["messages"]) // 4
+        completion_tokens = len(answer) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "replay"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def stream(self, request):
+        """Returns the chunks of a streamed chat completion, as a generator that waits like the service would."""
+        prompt = request["messages"][-1]["content"]
+        return self._stream_chunks(request, self.responder(prompt))
+
+    def _stream_chunks(self, request, answer):
+        # Words with the whitespace after them stand in for tokens; the last one arrives after the latency of a complete answer
+        tokens = re.findall(r"\S+\s*|\s+", answer) or [""]
+        latency = self.llm_latency * (1 + random.uniform(-self.jitter, self.jitter))
+        time.sleep(latency * FIRST_TOKEN_SHARE)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(latency * (1 - FIRST_TOKEN_SHARE) / len(tokens))
+            yield self._chunk(completion_id, request, {"content": token}, None)
+        with self._lock:
+            self.completions += 1
+        yield self._chunk(completion_id, request, {}, "stop")
+
+    def _chunk(self, completion_id, request, delta, finish_reason):
+        return {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": request.get("model", "replay"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+    def upload(self, session, csv_content):
+        self._sleep(self.semdis_latency)
+        with self._lock:
+            self._uploads[session] = csv_content
+            self.uploads += 1
+
+    def download(self, session):
+        """Returns the ratings CSV of the session's last upload, or None without an upload."""
+        with self._lock:
+            csv_content = self._uploads.get(session)
+        if csv_content is None:
+            return None
+        header, rows = parse_ratings(csv_content)
+        lines = [["item", "response", self.rating_column]]
+        lines.extend([row[0], row[1], self.rating(row[1])] for row in rows if len(row) >= 2)
+        return "".join(",".join(_csv_field(field) for field in line) + "\r\n" for line in lines).encode("utf-8")
+
+
+def _csv_field(value):
+    if any(char in value for char in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _cookies(self):
+            cookies = {}
+            for part in self.headers.get("Cookie", "").split(";"):
+                name, _, value = part.strip().partition("=")
+                if name:
+                    cookies[name] = value
+            return cookies
+
+        def _send(self, status, body=b"", content_type="text/plain", cookies=()):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for cookie in cookies:
+                self.send_header("Set-Cookie", cookie)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _send_events(self, events):
+            """Sends a stream of server-sent events in chunked transfer encoding, as the OpenAI API streams completions."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for event in events:
+                data = f"data: {event}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def do_GET(self):
+            if self.path.startswith("/semdis"):
+                # Hand out a session and a CSRF token, like the SemDis form page
+                self._send(200, b"<html></html>", "text/html", cookies=(
+                    f"csrftoken={uuid.uuid4().hex}; Path=/", f"sessionid={uuid.uuid4().hex}; Path=/"))
+            elif self.path.startswith("/v1/models"):
+                self._send(200, json.dumps({"object": "list", "data": [{"id": "replay", "object": "model"}]}).encode("utf-8"),
+                           "application/json")
+            elif self.path.startswith("/csvdownload"):
+                content = service.download(self._cookies().get("sessionid"))
+                if content is None:
+                    self._send(404, b"No upload for this session.")
+                else:
+                    self._send(200, content, "text/csv")
+            else:
+                self._send(404)
+
+        def do_POST(self):
+            body = self._body()
+            if self.path.startswith("/v1/chat/completions"):
+                try:
+                    request = json.loads(body)
+                    if request.get("stream"):
+                        chunks = service.stream(request)
+                    else:
+                        response = service.complete(request)
+                except (ValueError, KeyError, IndexError) as e:
+                    self._send(400, json.dumps({"error": {"message": str(e)}}).encode("utf-8"), "application/json")
+                    return
+                if request.get("stream"):
+                    self._send_events(itertools.chain((json.dumps(chunk) for chunk in chunks), ["[DONE]"]))
+                else:
+                    self._send(200, json.dumps(response).encode("utf-8"), "application/json")
+            elif self.path.startswith("/semdis"):
+                cookies = self._cookies()
+                fields = _multipart_fields(self.headers.get("Content-Type", ""), body)
+                if not cookies.get("csrftoken") or fields.get("csrfmiddlewaretoken") != cookies["csrftoken"].encode("utf-8"):
+                    self._send(403, b"CSRF verification failed.")
+                    return
+                service.upload(cookies.get("sessionid"), fields.get("csv_file", b""))
+                self._send(200, b"OK")
+            else:
+                self._send(404)
+
+    return Handler
+
+
+def _multipart_fields(content_type, body):
+    """Parses a multipart/form-data body into {field name: bytes}."""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body)
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = part.get_payload(decode=True) or b""
+    return fields
+
+
+def _speech_result(transcript, is_final, stability):
+    alternative = SimpleNamespace(transcript=transcript, confidence=1.0 if is_final else 0.0)
+    return SimpleNamespace(alternatives=[alternative], is_final=is_final, stability=1.0 if is_final else stability)
+
+
+def _speech_response(transcript, is_final, stability=0.5):
+    return SimpleNamespace(results=[_speech_result(transcript, is_final, stability)])
+
+
+def _split_interim_response(transcript):
+    """An interim response with the transcript's last word as an unstable tail after the stable rest."""
+    words = transcript.split()
+    if len(words) < 2:
+        return _speech_response(transcript, is_final=False, stability=STABLE_INTERIM_STABILITY)
+    return SimpleNamespace(results=[_speech_result(" ".join(words[:-1]), False, STABLE_INTERIM_STABILITY),
+                                    _speech_result(" " + words[-1], False, UNSTABLE_INTERIM_STABILITY)])
+
+
+def _revise_stable_words(transcript):
+    """Misrecognizes the last word before the unstable tail, as speech recognition does before it settles on the final text."""
+    words = transcript.split()
+    index = max(0, len(words) - 2)
+    words[index] = words[index][:-1] if len(words[index]) > 1 else words[index] + "h"
+    return " ".join(words)
+
+
+class ReplaySpeechClient:
+    """
+    Stand-in for SpeechClient that replays recorded transcripts, one final result every interval seconds.
+
+    Each transcript is preceded by an interim result with its first half, like a live stream. With a
+    finalization_delay, the full text is also an interim response that long before the final result, like
+    the wait for the end of an utterance: a stable result with all but the last word and an unstable one
+    with the last word. In a share revision_rate of the transcripts (the same ones in every run), the last
+    word of the stable result differs from the final one.
+    The audio requests are consumed but ignored; the stream ends when they end or all transcripts were replayed.
+    """
+    def __init__(self, transcripts, interval=3.0, finalization_delay=0.0, revision_rate=0.0):
+        self.transcripts = list(transcripts)
+        self.interval = interval
+        self.finalization_delay = min(finalization_delay, interval / 2)
+        self.revision_rate = revision_rate
+        self.position = 0
+        # Set once every transcript was replayed
+        self.exhausted = not self.transcripts
+
+    @classmethod
+    def from_csv(cls, path, interval=3.0, finalization_delay=0.0, revision_rate=0.0):
+        return cls(read_transcripts(path), interval, finalization_delay, revision_rate)
+
+    def streaming_recognize(self, config, requests):
+        audio_done = threading.Event()
+
+        def consume():
+            for _ in requests:
+                pass
+            audio_done.set()
+
+        threading.Thread(target=consume, daemon=True).start()
+        while self.position < len(self.transcripts):
+            transcript = self.transcripts[self.position]
+            words = transcript.split()
+            if audio_done.wait(self.interval / 2):
+                return
+            yield _speech_response(" ".join(words[:max(1, len(words) // 2)]), is_final=False)
+            if self.finalization_delay > 0:
+                if audio_done.wait(self.interval / 2 - self.finalization_delay):
+                    return
+                revised = zlib.crc32(transcript.encode("utf-8")) % 1000 < self.revision_rate * 1000
+                yield _split_interim_response(_revise_stable_words(transcript) if revised else transcript)
+                if audio_done.wait(self.finalization_delay):
+                    return
+            elif audio_done.wait(self.interval / 2):
+                return
+            self.position += 1
+            yield _speech_response(transcript, is_final=True)
+        self.exhausted = True
+
+
+class SilentAudioStream(BufferedAudioStream):
+    """Stand-in for MicrophoneStream that records silence in real time, for sessions without a microphone."""
+    def __init__(self, rate, chunk, buffer_seconds=30):
+        super().__init__(rate, chunk, buffer_seconds)
+        self._silence = bytes(2 * chunk)  # 16-bit samples
+        self._stopped = threading.Event()
+
+    def __enter__(self):
+        self.closed = False
+        threading.Thread(target=self._record, daemon=True).start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.stop()
+
+    def _record(self):
+        while not self._stopped.wait(self.chunk_seconds):
+            self.buffer.write(self._silence)
+
+    def stop(self):
+        self.closed = True
+        self._stopped.set()
+        self.buffer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves the OpenAI and SemDis stand-ins for a recorded session.")
+    parser.add_argument("--session", required=True, help="archived session folder with idea_pairs.csv and ratings.csv")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--semdis-latency", type=float, default=1.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args()
+
+    rating_column, ratings = read_recorded_ratings(args.session)
+    server = FakeServiceServer(ArchiveResponder(read_recorded_ideas(args.session)), ratings, rating_column,
+                               args.llm_latency, args.semdis_latency, args.jitter, port=args.port)
+    print(f"🧪 Serving OpenAI ({server.url}/v1) and SemDis ({server.url}/semdis) stand-ins. Ctrl+C to stop.")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,37 @@
 import warnings
 warnings.simplefilter("ignore", UserWarning)
 
-from google.cloud.speech import RecognitionConfig, StreamingRecognitionConfig, StreamingRecognizeRequest, SpeechClient
-import pyaudio
-from six.moves import queue
-from google.oauth2 import service_account
-from openai import OpenAI
+import time
+import_started = time.perf_counter()
+
+# Heavy dependencies (Google Cloud Speech, OpenAI, PyAudio, matplotlib, pandas) are imported where they are
+# first used, so starting a session does not wait for them one after another
 import os
 import re
 import csv
 import itertools
 import keyboard
 import threading
+import asyncio
 from difflib import get_close_matches
-import sys
-import subprocess
-import matplotlib.pyplot as plt
 import numpy as np
 import csv
-import time
-import google.api_core.exceptions
-from plotter import live_plotter
+from semdis_api import SemDisClient, print_ratings
+from semdis_local import LocalSemDisScorer
+from ratings_store import RatingsStore, parse_rating
+from rating_cache import RatingCache
+from events import UpdateChannel, EventLog
+from pipeline import Pipeline, Stage
+from idea_index import IdeaIndex, select_prior_ideas
+from dedup import DedupIndex, SemanticDedupIndex
+from audio_buffer import BufferedAudioStream
+from vad import VoiceActivityGate
+from tracing import LatencyTracer, StartupTimer, LATENCY_SUMMARY_FILENAME
+from session_store import SessionStore, recover_sessions, IDEA_PAIRS_FILENAME, RATINGS_FILENAME
+from speculation import Speculation, SpeculationTracker, remainder
+from transcript_windows import LastNWindow, TokenBudgetWindow, SinceExtractionWindow, OverlapWindow
 import shutil
 from datetime import datetime
-import pandas as pd
 
 INPUT_DEVICE_INDEX = 1 # 1: emeet, 3: normal microphone
 PARTICIPANT_NUMBERS = "C3536"
@@ -32,134 +40,318 @@ TASK_ITEM = "paperclip"
 ### Task
 TASK_TITLE = "Alternative uses for a " + TASK_ITEM
 TASK_DESCRIPTION = f"Come up with as many alternative uses as possible for a {TASK_ITEM}. Your goal is to be as creative as possible."
+# Several participants at once, each on their own microphone: [(participant, task item, input device index), ...]
+# Empty: one session with PARTICIPANT_NUMBERS, TASK_ITEM and INPUT_DEVICE_INDEX
+SESSIONS = []
+
+### Backends
+# "replay" swaps a service for the local stand-ins of fake_servers.py, which replay a recorded session
+SPEECH_BACKEND = "google" # "google": Google Cloud Speech, "replay": transcripts from REPLAY_TRANSCRIPTS_FILE
+LLM_BACKEND = "openai" # "openai": OpenAI API, "replay": stand-in server at REPLAY_SERVER_URL
+REPLAY_SERVER_URL = "http://127.0.0.1:8765" # start with: python fake_servers.py --session data/<session folder>
+REPLAY_TRANSCRIPTS_FILE = "transcripts.csv" # an archived session's transcripts.csv
+REPLAY_TRANSCRIPT_INTERVAL = 3.0 # seconds between replayed transcripts
+REPLAY_FINALIZATION_DELAY = 0.0 # seconds a replayed transcript is a stable interim result before it is final
+REPLAY_REVISION_RATE = 0.0 # share of those interim results whose last stable word is revised in the final one
+
+### Scoring
+SCORING_BACKEND = "remote" # "remote": SemDis website, "local": word vectors from WORD_VECTORS_FILE, "replay": stand-in server
+WORD_VECTORS_FILE = "word-vectors.txt" # text vectors, or a .semvec store from embedding_store.py (memory-mapped)
+WORD_VECTORS_COMPOSITION = "multiply" # how multi-word responses are composed: "multiply" or "add"
+
+### Duplicate filtering
+# Also reject paraphrases of earlier ideas ("build a house" ≈ "construct a building") with word vectors from WORD_VECTORS_FILE
+SEMANTIC_DEDUP = False
+SEMANTIC_DEDUP_THRESHOLD = 0.85 # cosine similarity of averaged word vectors
+
+### Startup
+# Create the clients and open their connections in parallel while the microphone opens, so the first idea does not pay for them
+PREWARM_SERVICES = True
+PREWARM_TIMEOUT = 10 # seconds to wait for a connection; a slow service is still used, just not warmed up
 
 ### Filenames
 OPENAI_API_KEY_FILE = "OpenAI-API-key.txt"
 GOOGLE_CLOUD_SPEECH_CREDENTIAL_FILE = "spech-text-gpt-semdis-f8647f2e5b71.json"
-IDEA_PAIRS_FILENAME = "idea_pairs.csv"
-RATINGS_FILENAME = "ratings.csv"
-TRANSCRIPTS_FILENAME = "transcripts.csv"
+# Ratings of responses seen in earlier sessions, shared across sessions on this machine; opened on the first rating
+RATING_CACHE_FILE = "rating_cache.sqlite3"
+# Sessions are recorded straight into data/<date>_<time>_<participant>_<item> (see session_store.py)
+DATA_FOLDERNAME = "data"
+FRAMES_FOLDERNAME = "frames"
 
 ### Variables
-# Flag to stop the program
-terminate_program = False
+# Maximum number of concurrent LLM requests; transcripts arriving meanwhile are merged into the next one
+MAX_LLM_REQUESTS_IN_FLIGHT = 1
+# Stream LLM completions: each idea goes on to filtering and scoring as soon as its ";" arrives, not after the whole answer
+STREAM_COMPLETIONS = False
+# Start extraction on interim transcripts once speech recognition rates them as stable, before they are final (see speculation.py)
+SPECULATIVE_EXTRACTION = False
+SPECULATION_MIN_STABILITY = 0.8 # stability of the interim result, 0-1
+SPECULATION_MIN_WORDS = 3
+# Which transcripts are sent with each LLM request (see transcript_windows.py):
+# "last_n": the last TRANSCRIPT_WINDOW, "token_budget": the new ones plus earlier ones within TRANSCRIPT_WINDOW_TOKENS,
+# "since_extraction": all since the last request that found ideas (at most TRANSCRIPT_WINDOW_MAX),
+# "overlap": the new ones plus the last TRANSCRIPT_WINDOW_OVERLAP already sent
+TRANSCRIPT_WINDOW_STRATEGY = "last_n"
+TRANSCRIPT_WINDOW = 4
+TRANSCRIPT_WINDOW_TOKENS = 150
+TRANSCRIPT_WINDOW_MAX = 8
+TRANSCRIPT_WINDOW_OVERLAP = 1
+# Budget for the previous ideas in the prompt: only the ideas most similar to the transcript window are listed
+PROMPT_CONTEXT_MAX_IDEAS = 20
+PROMPT_CONTEXT_MAX_CHARS = 1000
+# Seconds of audio kept in the microphone ring buffer; also the most audio replayed to a new speech stream
+AUDIO_BUFFER_SECONDS = 30
+# Speech streams are limited to about 5 minutes; a new one is started after this many seconds
+STREAM_ROTATE_SECONDS = 240
+# Voice activity detection: only speech (plus pre-roll before and hangover after it) is sent to speech recognition
+VAD_ENABLED = True
+VAD_PREROLL_SECONDS = 0.3 # kept before each speech onset, so the starts of words are not cut off
+VAD_HANGOVER_SECONDS = 0.5 # kept after the last speech, so short pauses inside sentences pass
+VAD_KEEPALIVE_SECONDS = 5 # during silence, a silent chunk is sent this often to keep the stream open
+# Capacity of the queues between pipeline stages
+TRANSCRIPT_QUEUE_SIZE = 16
+IDEA_QUEUE_SIZE = 16
+# Seconds that queued transcripts and ideas get to finish processing after ESC
+SHUTDOWN_DRAIN_TIMEOUT = 30
+# Seconds to wait for the speech stream to close after ESC
+STT_STOP_TIMEOUT = 5
+# Seconds between queue depth reports while work is queued
+PIPELINE_REPORT_INTERVAL = 5
 visualization_size = 10
+# Minimum time between two plot redraws (seconds); updates arriving in between are drawn together
+MIN_FRAME_INTERVAL = 0.5
+# How often the idle plot window processes GUI events (seconds)
+GUI_EVENT_INTERVAL = 0.1
+# Headless mode: no window, the plot is rendered off-screen and its frames are saved to the session archive
+HEADLESS = False
+HEADLESS_MAX_FPS = 2
+HEADLESS_TIMELINE_FORMAT = "gif" # "gif", "mp4" (needs ffmpeg) or None for PNG frames only
 
 ### Google Cloud Speech
 # Audio recording parameters
 RATE = 16000
 CHUNK = int(RATE / 10)  # 100ms
-# Load credentials
-credentials = service_account.Credentials.from_service_account_file(GOOGLE_CLOUD_SPEECH_CREDENTIAL_FILE)
 
-### OpenAI API
-# Load API key
-if not os.path.exists(OPENAI_API_KEY_FILE):
-    raise FileNotFoundError(f"The file '{OPENAI_API_KEY_FILE}' was not found. Please create it and add your OpenAI API key.")
-with open(OPENAI_API_KEY_FILE, "r") as file:
-    openai_api_key = file.read().strip()
-# Configure OpenAI API
-client = OpenAI(api_key=openai_api_key)
+### Services
+def create_speech_client():
+    """Creates the speech-to-text client of SPEECH_BACKEND."""
+    if SPEECH_BACKEND == "google":
+        from google.cloud.speech import SpeechClient
+        from google.oauth2 import service_account
+        credentials = service_account.Credentials.from_service_account_file(GOOGLE_CLOUD_SPEECH_CREDENTIAL_FILE)
+        return SpeechClient(credentials=credentials)
+    if SPEECH_BACKEND == "replay":
+        from fake_servers import ReplaySpeechClient
+        return ReplaySpeechClient.from_csv(REPLAY_TRANSCRIPTS_FILE, interval=REPLAY_TRANSCRIPT_INTERVAL,
+                                           finalization_delay=REPLAY_FINALIZATION_DELAY, revision_rate=REPLAY_REVISION_RATE)
+    raise ValueError(f"Unknown speech backend '{SPEECH_BACKEND}', use 'google' or 'replay'.")
+
+def create_llm_client():
+    """Creates the OpenAI client of LLM_BACKEND."""
+    from openai import OpenAI
+    if LLM_BACKEND == "openai":
+        if not os.path.exists(OPENAI_API_KEY_FILE):
+            raise FileNotFoundError(f"The file '{OPENAI_API_KEY_FILE}' was not found. Please create it and add your OpenAI API key.")
+        with open(OPENAI_API_KEY_FILE, "r") as file:
+            openai_api_key = file.read().strip()
+        return OpenAI(api_key=openai_api_key)
+    if LLM_BACKEND == "replay":
+        # The stand-in speaks the chat completions API, so the real client is used
+        return OpenAI(api_key="replay", base_url=f"{REPLAY_SERVER_URL}/v1")
+    raise ValueError(f"Unknown LLM backend '{LLM_BACKEND}', use 'openai' or 'replay'.")
+
+def create_scorer():
+    """Creates the rating backend of SCORING_BACKEND: the SemDis website, the local word-vector scorer or the stand-in."""
+    if SCORING_BACKEND == "remote":
+        # One client for the whole session keeps its connection and CSRF token alive between updates
+        return SemDisClient()
+    if SCORING_BACKEND == "local":
+        return LocalSemDisScorer(WORD_VECTORS_FILE, composition=WORD_VECTORS_COMPOSITION)
+    if SCORING_BACKEND == "replay":
+        return SemDisClient(upload_url=f"{REPLAY_SERVER_URL}/semdis", download_url=f"{REPLAY_SERVER_URL}/csvdownload")
+    raise ValueError(f"Unknown scoring backend '{SCORING_BACKEND}', use 'remote', 'local' or 'replay'.")
+
+def scorer_identity():
+    """Identifies the ratings of SCORING_BACKEND in the rating cache; the local scorer's also depend on its model."""
+    if SCORING_BACKEND != "local":
+        return SCORING_BACKEND
+    try:
+        stat = os.stat(WORD_VECTORS_FILE)
+        vectors = f"{os.path.abspath(WORD_VECTORS_FILE)}:{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        vectors = os.path.abspath(WORD_VECTORS_FILE)
+    return f"local:{vectors}:{WORD_VECTORS_COMPOSITION}"
+
+def warm_speech_client(speech_client):
+    """Opens the gRPC channel of the Google client ahead of the first stream."""
+    channel = getattr(getattr(speech_client, "transport", None), "grpc_channel", None)
+    if channel is not None:
+        import grpc
+        grpc.channel_ready_future(channel).result(timeout=PREWARM_TIMEOUT)
+
+def warm_llm_client(llm_client):
+    """Opens the connection to the OpenAI API with a cheap request."""
+    llm_client.with_options(timeout=PREWARM_TIMEOUT, max_retries=0).models.list()
+
+def warm_scorer(scorer):
+    """Opens the SemDis connection and fetches its CSRF token; the local scorer has nothing to warm up."""
+    warm_up = getattr(scorer, "warm_up", None)
+    if warm_up is not None:
+        warm_up()
+
+SERVICE_FACTORIES = {"speech": create_speech_client, "llm": create_llm_client, "scorer": create_scorer}
+SERVICE_WARMUPS = {"speech": warm_speech_client, "llm": warm_llm_client, "scorer": warm_scorer}
+# Clients are created on first use, so importing this module needs no credentials
+services = {}
+# One lock per client, so the clients can be created in parallel
+service_locks = {name: threading.Lock() for name in SERVICE_FACTORIES}
+
+def get_service(name):
+    """Returns the shared "speech", "llm" or "scorer" client, creating it on first use."""
+    with service_locks[name]:
+        if name not in services:
+            services[name] = SERVICE_FACTORIES[name]()
+        return services[name]
+
+def close_services():
+    """Closes the clients, so the next session creates them for the current backends."""
+    for name, lock in service_locks.items():
+        with lock:
+            service = services.pop(name, None)
+            close = getattr(service, "close", None)
+            if close is not None:
+                close()
+
+def prewarm_service(name):
+    """Creates a client (loading its credentials) and opens its connection, timing both steps."""
+    try:
+        with startup_timer.measure(f"{name} client"):
+            service = get_service(name)
+        with startup_timer.measure(f"{name} connection"):
+            SERVICE_WARMUPS[name](service)
+    except Exception as e:
+        # The session reports the error when it first uses the client
+        print(f"⚠️ Could not warm up the {name} client: {e}")
+
+def prewarm_services():
+    """Warms up all clients in parallel daemon threads; returns the threads."""
+    threads = [threading.Thread(target=prewarm_service, args=(name,), daemon=True) for name in SERVICE_FACTORIES]
+    for thread in threads:
+        thread.start()
+    return threads
 
+def create_transcript_window():
+    """Creates the transcript window strategy of TRANSCRIPT_WINDOW_STRATEGY."""
+    if TRANSCRIPT_WINDOW_STRATEGY == "last_n":
+        return LastNWindow(TRANSCRIPT_WINDOW)
+    if TRANSCRIPT_WINDOW_STRATEGY == "token_budget":
+        return TokenBudgetWindow(TRANSCRIPT_WINDOW_TOKENS)
+    if TRANSCRIPT_WINDOW_STRATEGY == "since_extraction":
+        return SinceExtractionWindow(TRANSCRIPT_WINDOW_MAX)
+    if TRANSCRIPT_WINDOW_STRATEGY == "overlap":
+        return OverlapWindow(TRANSCRIPT_WINDOW_OVERLAP)
+    raise ValueError(f"Unknown transcript window '{TRANSCRIPT_WINDOW_STRATEGY}', use 'last_n', 'token_budget', 'since_extraction' or 'overlap'.")
 
+def create_dedup_index():
+    """Creates the duplicate filter of a session, with the semantic check if SEMANTIC_DEDUP is on."""
+    semantic = None
+    if SEMANTIC_DEDUP:
+        # Share the vectors already loaded by the local scorer
+        vectors = get_service("scorer").vectors if SCORING_BACKEND == "local" else WORD_VECTORS_FILE
+        semantic = SemanticDedupIndex(vectors, threshold=SEMANTIC_DEDUP_THRESHOLD)
+    return DedupIndex(semantic=semantic)
 
-class MicrophoneStream:
-    """Opens a recording stream as a generator yielding the audio chunks."""
-    def __init__(self, rate, chunk):
-        self._rate = rate
-        self._chunk = chunk
-        self._buff = queue.Queue()
-        self.closed = True
+# Duration of each startup step of the current run
+startup_timer = StartupTimer()
+# Bumped whenever any session publishes new ideas or ratings, to wake up the plot
+plot_updates = UpdateChannel()
+
+
+class MicrophoneStream(BufferedAudioStream):
+    """Records the microphone into a ring buffer; generator() yields the audio chunks as memoryviews."""
+    def __init__(self, rate, chunk, buffer_seconds=AUDIO_BUFFER_SECONDS, input_device_index=INPUT_DEVICE_INDEX):
+        super().__init__(rate, chunk, buffer_seconds)
+        self.input_device_index = input_device_index
+        self._stop_lock = threading.Lock()
 
     def __enter__(self):
+        import pyaudio
+        self._continue = pyaudio.paContinue
         self._audio_interface = pyaudio.PyAudio()
         self._audio_stream = self._audio_interface.open(
             format=pyaudio.paInt16,
             channels=1,
-            rate=self._rate,
+            rate=self.rate,
             input=True,
-            input_device_index=INPUT_DEVICE_INDEX,  # Change this index for different microphone
-            frames_per_buffer=self._chunk,
+            input_device_index=self.input_device_index,  # Change this index for different microphone
+            frames_per_buffer=self.chunk,
             stream_callback=self._fill_buffer,
         )
         self.closed = False
         return self
 
     def __exit__(self, type, value, traceback):
-        self._audio_stream.stop_stream()
-        self._audio_stream.close()
-        self.closed = True
-        self._buff.put(None)
+        self.stop()
         self._audio_interface.terminate()
 
-    def _fill_buffer(self, in_data, frame_count, time_info, status_flags):
-        """Continuously collect data from the audio stream into the buffer."""
-        self._buff.put(in_data)
-        return None, pyaudio.paContinue
-
-    def generator(self):
-        """Yields audio chunks from the stream."""
-        while not self.closed:
-            chunk = self._buff.get()
-            if chunk is None:
+    def stop(self):
+        """Stops recording and ends the generators; safe to call from another thread."""
+        with self._stop_lock:
+            if self.closed:
                 return
-            yield chunk
+            self.closed = True
+            self._audio_stream.stop_stream()
+            self._audio_stream.close()
+        self.buffer.close()
+
+    def _fill_buffer(self, in_data, frame_count, time_info, status_flags):
+        """Continuously collect data from the audio stream into the ring buffer."""
+        self.buffer.write(in_data)
+        return None, self._continue
 
 def is_similar(new_idea, existing_ideas, similarity_threshold=0.8):
     """Checks if a new idea is similar to any in the existing ideas list using fuzzy matching."""
     close_matches = get_close_matches(new_idea, existing_ideas, n=1, cutoff=similarity_threshold)
     return len(close_matches) > 0
 
-def read_csv():
-    """Reads CSV and extracts ideas and ratings."""
+def filter_new_ideas(candidate_ideas, ideas_list, dedup_index=None):
+    """Returns the candidates that are neither exact nor similar duplicates of known ideas or of each other.
+
+    A dedup_index holding ideas_list gives the same decisions as is_similar without comparing against every idea,
+    and with SEMANTIC_DEDUP it also rejects paraphrases.
+    """
+    new_ideas = []
+    for idea in candidate_ideas:
+        if not idea:
+            continue
+        if dedup_index is not None:
+            if dedup_index.is_similar(idea, new_ideas):
+                continue
+        elif is_similar(idea, ideas_list + new_ideas):
+            continue
+        new_ideas.append(idea)
+    return new_ideas
+
+def extract_ideas_and_ratings(rows):
+    """Extracts ideas and ratings from SemDis rating rows."""
+    ideas, ratings = [], []
+    for row in rows:
+        ideas.append(row[1])  # Second column (idea)
+        ratings.append(parse_rating(row[2]))  # Third column (rating)
+    return ideas, ratings
+
+def read_csv(folder):
+    """Reads the ratings.csv of a session folder and extracts ideas and ratings."""
     try:
-        with open(RATINGS_FILENAME, "r", encoding="utf-8") as file:
+        with open(os.path.join(folder, RATINGS_FILENAME), "r", encoding="utf-8") as file:
             reader = csv.reader(file)
             # Skip header
             next(reader)
-
-            ideas, ratings = [], []
-            for row in reader:
-                ideas.append(row[1])  # Second column (idea)
-                ratings.append(float(row[2]))  # Third column (rating)
-
-            return ideas, ratings
+            return extract_ideas_and_ratings(reader)
     except Exception as e:
-        global terminate_program
-        if not terminate_program:
-            print(f"Error reading CSV: {e}")
+        print(f"Error reading CSV: {e}")
         return [], []
 
-def save_ideas_to_csv(ideas_list, filename=IDEA_PAIRS_FILENAME):
-    """Saves unique ideas to a CSV file and runs a SemDis API call."""
-    
-    if not ideas_list:
-        print("No ideas to save!")
-        return
-    
-    # Remove potential duplicates before saving
-    unique_ideas = list(dict.fromkeys(ideas_list))
-
-    #Save item-idea pairs to CSV
-    with open(filename, mode="w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        # Write header
-        writer.writerow(["item", "response"])
-        # Write item-idea pairs
-        for idea in unique_ideas:
-            writer.writerow([TASK_ITEM, idea])
-
-    print(f"Ideas saved to {filename}!")
-
-    # Run semdis_api.py
-    try:
-        print("\nRunning semdis_api.py...")
-        subprocess.run(["python", "semdis_api.py"], check=True)
-        print("\nsemdis_api.py executed successfully!\n")
-        # update_visualization()
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error running script: {e}")
-
 def fill_list(ratings, target_length=20):
     if len(ratings) < target_length:
         # Prepend zeros if the list is too short
@@ -169,276 +361,864 @@ def fill_list(ratings, target_length=20):
         return ratings[-target_length:]
         #return ratings
     
-def update_visualization(ideas_list):
-    line = []
-    size = visualization_size
-    x_vec = np.linspace(0,1,size+1)[0:-1]
-    while True:
-        try:
-            ideas, ratings = read_csv()
-            # Ensure lists match in size
-            ratings_filled = fill_list(ratings, size)
-            ideas_filled = fill_list(ideas, size)
-            
-            # Call live_plotter with proper arguments
-            line = live_plotter(x_vec, ratings_filled, line, ideas_list, ratings, idea_annotations=ideas_filled, title=TASK_TITLE)
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-        time.sleep(0.5)
-
-
-def send_to_chatgpt(ideas_list, transcripts_list):
-    # Process full transcript
-    # TODO: explore transcript windows as an alternative and benchmark them
-    latest_transcript = ' '.join(transcripts_list[-4:])
-
-    if not latest_transcript.strip():
-        print("Empty transcript!")
-        return
-
-    prompt = (
-        f"Extract alternative uses for a {TASK_ITEM} from the following text:\n"
+def build_prompt(latest_transcript, previous_ideas, item=None):
+    """Builds the extraction prompt for a transcript window and the prior ideas to compare with."""
+    item = item or TASK_ITEM
+    return (
+        f"Extract alternative uses for a {item} from the following text:\n"
         f"{latest_transcript}\n\n"
         "Instructions:\n"
         "1. Extract only the alternative uses explicitly mentioned in the text. Do NOT, under any circumstances, add any ideas of your own.\n"
         "2. The extracted ideas must be **realistic and physically feasible**.\n"
-        f"   - **Reject ideas that do not involve an actual function of a {TASK_ITEM}.**\n" # function -> use, affordance, "something you can do with x"
+        f"   - **Reject ideas that do not involve an actual function of a {item}.**\n" # function -> use, affordance, "something you can do with x"
         "   - **Reject phrases that are just expressions, insults, or abstract concepts (e.g., 'be a dick').**\n"
         "   - Example: 'use as a nail' ❌ (bricks do not function as nails).\n" # mpre generic
         "   - Example: 'turn into a trampoline' ❌ (bricks do not bounce).\n"# kkkkkkkk
         "3. Compare with previous ideas:\n"
-        f"{', '.join(ideas_list)}\n"
+        f"{', '.join(previous_ideas)}\n"
         "   - Do NOT return similar ideas (e.g., 'build a house' ≈ 'build a building').\n"
         "4. If no valid new ideas exist, return: New Ideas: none\n"
         "5. Format response as:\n"
         "New Ideas: idea1; idea2; idea3\n"
     )
 
+def create_completion(prompt, **options):
+    """Sends the extraction prompt to the LLM; options are passed on to the API (e.g. stream=True)."""
+    return get_service("llm").chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "system", "content": "You are an assistant that strictly extracts new ideas from transcripts. "
+                                                "You do NOT generate ideas, only extract them from user speech."},
+                  {"role": "user", "content": prompt}],
+        max_tokens=200,
+        temperature=0.2,
+        **options
+    )
+
+def request_completion(prompt):
+    """Sends the extraction prompt to the LLM and returns the API response."""
+    return create_completion(prompt)
+
+def stream_completion(prompt):
+    """Sends the extraction prompt to the LLM with streaming; yields the answer text as it is generated."""
+    for chunk in create_completion(prompt, stream=True):
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def parse_ideas(answer):
+    """Extracts the ideas from an answer of the form 'New Ideas: idea1; idea2'."""
+    answer_ideas_string = re.search(r"New Ideas:\s*(.*)", answer, re.IGNORECASE)
+    answer_ideas = answer_ideas_string.group(1).strip() if answer_ideas_string else ""
+    if answer_ideas.lower() == "none":
+        return []
+    return [idea.strip() for idea in answer_ideas.split(";")]
+
+class IdeaStreamParser:
+    """Parses a streamed answer into the ideas of parse_ideas, each one as soon as the ";" after it arrives."""
+    def __init__(self):
+        self.answer = ""
+        self.ideas = []
+        # Offset in answer up to which the ideas were returned; None until "New Ideas:" arrived
+        self._parsed = None
+        self._ended = False
+
+    def feed(self, text):
+        """Adds streamed text; returns the ideas it completed."""
+        self.answer += text
+        if self._ended:
+            return []
+        if self._parsed is None:
+            match = re.search(r"New Ideas:\s*", self.answer, re.IGNORECASE)
+            # Wait for a character after the whitespace, which could still continue in the next text
+            if match is None or match.end() == len(self.answer):
+                return []
+            self._parsed = match.end()
+        # Like parse_ideas, the ideas end at the end of the line
+        end = self.answer.find("\n", self._parsed)
+        if end != -1:
+            self._ended = True
+        else:
+            end = self.answer.rfind(";", self._parsed) + 1
+            if end <= self._parsed:
+                return []
+        ideas = [idea.strip() for idea in self.answer[self._parsed:end].split(";")]
+        self._parsed = end
+        return self._found(ideas)
+
+    def finish(self):
+        """Returns the ideas after the last ";" once the answer is complete."""
+        if self._ended or self._parsed is None:
+            return []
+        self._ended = True
+        return self._found([idea.strip() for idea in self.answer[self._parsed:].split(";")])
+
+    def _found(self, ideas):
+        ideas = [idea for idea in ideas if idea]
+        # A lone "none" means there were no ideas
+        if self._ended and not self.ideas and [idea.lower() for idea in ideas] == ["none"]:
+            return []
+        self.ideas.extend(ideas)
+        return ideas
+
+def previous_ideas_for_prompt(latest_transcript, ideas_list, idea_index=None):
+    """Returns the prior ideas to include in the prompt: all of them, or the most relevant ones within the budget."""
+    if idea_index is None or len(ideas_list) <= PROMPT_CONTEXT_MAX_IDEAS:
+        return ideas_list
+    return select_prior_ideas(idea_index, latest_transcript, PROMPT_CONTEXT_MAX_IDEAS, PROMPT_CONTEXT_MAX_CHARS)
+
+def stream_ideas(prompt, on_idea, timings=None):
+    """Streams the completion and calls on_idea(idea, time) for each idea as soon as it is complete; returns all ideas."""
+    parser = IdeaStreamParser()
+    for text in stream_completion(prompt):
+        for idea in parser.feed(text):
+            on_idea(idea, time.monotonic())
+    for idea in parser.finish():
+        on_idea(idea, time.monotonic())
+    if timings is not None:
+        timings["llm_end"] = time.monotonic()
+    print(f"API Response: {parser.answer.strip()}\n")
+    return parser.ideas
+
+def send_to_chatgpt(ideas_list, transcripts_list, window=TRANSCRIPT_WINDOW, idea_index=None, dedup_index=None, timings=None, item=None, on_idea=None):
+    """Extracts new ideas from the latest transcripts; returns them without changing ideas_list.
+
+    With an idea_index, the prompt only lists the prior ideas most similar to the transcript window.
+    With a dedup_index, duplicates are found through the index instead of comparing against every idea.
+    A timings dict receives the "llm_start" and "llm_end" timestamps of the request, on the LatencyTracer clock.
+    With on_idea, the completion is streamed and each idea is passed to on_idea(idea, time) as soon as it is
+    complete, with the time it arrived; those ideas are not filtered, the caller filters them.
+    """
+    # The caller chooses the transcripts with a window strategy (transcript_windows.py); by default the last `window`
+    latest_transcript = ' '.join(transcripts_list[-window:])
+
+    if not latest_transcript.strip():
+        print("Empty transcript!")
+        return []
+
+    prompt = build_prompt(latest_transcript, previous_ideas_for_prompt(latest_transcript, ideas_list, idea_index), item)
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "system", "content": "You are an assistant that strictly extracts new ideas from transcripts. "
-                                                    "You do NOT generate ideas, only extract them from user speech."},
-                      {"role": "user", "content": prompt}],
-            max_tokens=200,
-            temperature=0.2
-        )
+        if timings is not None:
+            timings["llm_start"] = time.monotonic()
+        if on_idea is not None:
+            return stream_ideas(prompt, on_idea, timings)
+        response = request_completion(prompt)
+        if timings is not None:
+            timings["llm_end"] = time.monotonic()
 
         answer = response.choices[0].message.content.strip()
         print(f"API Response: {answer}\n")
 
         # Extract ideas into list
-        answer_ideas_string = re.search(r"New Ideas:\s*(.*)", answer, re.IGNORECASE)
-        answer_ideas = answer_ideas_string.group(1).strip() if answer_ideas_string else ""
-        if answer_ideas.lower() == "none":
+        extracted_ideas = parse_ideas(answer)
+        if not extracted_ideas:
             return []
-        extracted_ideas = [idea.strip() for idea in answer_ideas.split(";")]
 
         # **Stronger Filtering:** Remove ideas that are exact OR similar duplicates
-        new_ideas_filtered = [idea for idea in extracted_ideas if not is_similar(idea, ideas_list)]
+        new_ideas_filtered = filter_new_ideas(extracted_ideas, ideas_list, dedup_index)
 
         # No new ideas
         if not new_ideas_filtered:
             print("No truly new ideas detected after filtering.")
-            return
-        
-        # Process new ideas
-        print(f"💡 New ideas: {new_ideas_filtered}")
-        ideas_list.extend(new_ideas_filtered)
-        print(f"📄 Ideas List: {ideas_list}")
-        save_ideas_to_csv(ideas_list)
-        return
+        return new_ideas_filtered
     
     except Exception as e:
         print(f"OpenAI API error: {e}")
-        return
+        return []
 
-def listen_print_loop(responses, ideas_list, transcripts_list):
-    """Listens for speech and processes it in real time."""
+def listen_print_loop(responses, on_transcript, stopped=lambda: False, on_interim=None):
+    """Listens for speech and passes each final transcript and the time it arrived to on_transcript.
+
+    With on_interim, interim transcripts are passed to on_interim(transcript, stability). A response splits
+    the speech not yet final into a stable start and an unstable tail; the leading results with at least
+    SPECULATION_MIN_STABILITY are joined and passed with the stability of the least stable of them.
+    """
 
     #Google Cloud Speech
     for response in responses:
         # Stop if ESC key was pressed
-        if terminate_program:
+        if stopped():
             print("\nTerminating speech processing loop.\n")
             return
                 
-        if not response.results:
-            continue
-        result = response.results[0]
-        if not result.alternatives:
-            continue
-        transcript = result.alternatives[0].transcript.strip()
-
-        if result.is_final:
-            # Ignore empty transcript
-            if not transcript:
+        interim, stability, stable = [], 1.0, True
+        for result in response.results:
+            if not result.alternatives:
                 continue
-            # Process transcript content
-            print(f"Transcript: {transcript}")
-            # Add to list of transcripts
-            transcripts_list.append(transcript)
+            transcript = result.alternatives[0].transcript.strip()
 
-            # Run OpenAI API request in separate thread
-            processing_thread = threading.Thread(target=send_to_chatgpt, args=(ideas_list, transcripts_list), daemon=True)
-            processing_thread.start()
+            if result.is_final:
+                # Ignore empty transcript
+                if not transcript:
+                    continue
+                # Process transcript content
+                print(f"Transcript: {transcript}")
+                # Hand over to idea extraction
+                on_transcript(transcript, time.monotonic())
+            elif transcript and stable:
+                # Results after the first unstable one are dropped; without a stable result the first one is passed
+                stable = result.stability >= SPECULATION_MIN_STABILITY
+                if stable or not interim:
+                    interim.append(transcript)
+                    stability = min(stability, result.stability)
+        if on_interim is not None and interim:
+            on_interim(" ".join(interim), stability)
 
-def archive_session_data(transcripts_list):
-    """Creates a timestamped folder, saves transcripts to a CSV, copies data files into it, moves it to 'data', and deletes the originals."""
+def escape_key_listener(loop, shutdown):
+    """Waits for the ESC key press and asks the session to shut down."""
+    keyboard.wait("esc")  # Wait for ESC key press
+    print("\nESC pressed. Stopping everything...\n")
+    loop.call_soon_threadsafe(shutdown.set)
 
-    # Create a timestamped folder
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M") + "_" + PARTICIPANT_NUMBERS + "_" + TASK_ITEM
-    folder_path = os.path.join(os.getcwd(), timestamp)
-    os.makedirs(folder_path, exist_ok=True)
+class RecognitionStream:
+    """One streaming_recognize request, fed from the microphone ring buffer starting at a buffer position."""
+    def __init__(self, speech_client, audio, start, on_transcript, gate=None, stopped=lambda: False, on_interim=None):
+        self.speech_client = speech_client
+        self.audio = audio
+        self.start = start
+        self.on_transcript = on_transcript
+        self.on_interim = on_interim
+        self.stopped = stopped
+        # Optional VoiceActivityGate that holds back silence, shared with the streams before and after this one
+        self.gate = gate
+        # Buffer position of each chunk sent, to map result times back to the buffer
+        self.sent_positions = []
+        # Buffer position after the audio of the last final result
+        self.last_final = start
+        self.end = None
+        self.retired = False
+        self.discarded_results = 0
+        self.error = None
+        self._lock = threading.Lock()
 
-    # Create 'transcripts.csv' and save transcripts
-    try:
-        with open(TRANSCRIPTS_FILENAME, mode="w", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            for transcript in transcripts_list:
-                writer.writerow([transcript])
-        print(f"✅ Created {TRANSCRIPTS_FILENAME} with {len(transcripts_list)} transcripts.")
-    except Exception as e:
-        print(f"❌ Error creating {TRANSCRIPTS_FILENAME}: {e}")
+    def _requests(self):
+        """Yields the audio to send, as bytes."""
+        for position, chunk in self.audio.chunks(self.start, until=lambda: self.end):
+            # The gate passes to the next stream on rotation, so once retire() returns this stream no longer uses it
+            with self._lock:
+                # A retired stream's results are discarded, so it needs no more audio
+                if self.retired:
+                    return
+                forward = self.gate.process(position, chunk) if self.gate else [(position, chunk)]
+                self.sent_positions.extend(sent_position for sent_position, _ in forward)
+            for _, sent in forward:
+                # The request owns a copy; the memoryview is reused once the ring wraps around
+                yield bytes(sent)
 
-    # List files to copy
-    files_to_copy = [RATINGS_FILENAME, IDEA_PAIRS_FILENAME, TRANSCRIPTS_FILENAME]
+    def _track(self, responses):
+        """Passes responses on, remembering where the last final result ended; drops them once retired."""
+        for response in responses:
+            with self._lock:
+                if self.retired:
+                    self.discarded_results += 1
+                    continue
+                if response.results and response.results[0].is_final:
+                    # Result times count only the audio sent, which skips the silence held back by the gate
+                    end_time = getattr(response.results[0], "result_end_time", None)
+                    sent = round(end_time.total_seconds() / self.audio.chunk_seconds) if end_time else 0
+                    if 0 < sent <= len(self.sent_positions):
+                        self.last_final = self.sent_positions[sent - 1] + 1
+                    else:
+                        self.last_final = self.audio.buffer.position()
+            yield response
 
-    # Try copying files if they exist
-    successfully_copied = []
-    for file in files_to_copy:
+    def run(self):
         try:
-            shutil.copy2(file, os.path.join(folder_path, file))
-            print(f"✅ Copied {file} to {folder_path}")
-            successfully_copied.append(file)  # Track successful copies
-        except FileNotFoundError:
-            print(f"⚠️ File {file} not found, skipping.")
+            if SPEECH_BACKEND == "google":
+                from google.cloud.speech import RecognitionConfig, StreamingRecognitionConfig, StreamingRecognizeRequest
+                config = StreamingRecognitionConfig(config=RecognitionConfig(
+                    encoding=RecognitionConfig.AudioEncoding.LINEAR16,
+                    sample_rate_hertz=RATE,
+                    language_code="en-US",
+                ), interim_results=True)
+                requests = (StreamingRecognizeRequest(audio_content=audio) for audio in self._requests())
+            else:
+                # The stand-in ignores the configuration and takes the audio as it is
+                config, requests = None, self._requests()
+            responses = self.speech_client.streaming_recognize(config, requests)
+            listen_print_loop(self._track(responses), self.on_transcript, self.stopped, self.on_interim)
         except Exception as e:
-            print(f"❌ Error copying {file}: {e}")
+            self.error = e
+
+    def retire(self):
+        """Ends this stream's audio and discards its remaining results; returns the position a new stream replays from.
 
-    # If 'idea_pairs.csv' was copied, create 'idea_comparison.csv'
-    idea_pairs_path = os.path.join(folder_path, "idea_pairs.csv")
-    idea_comparison_path = os.path.join(folder_path, "idea_comparison.csv")
-    if os.path.exists(idea_pairs_path):
+        Everything after the last final result is replayed, so no speech is lost or transcribed twice.
+        """
+        with self._lock:
+            self.retired = True
+            self.end = self.audio.buffer.position()
+            return max(self.last_final, self.audio.buffer.oldest())
+
+def start_thread_stage(loop, target, *args):
+    """Runs a blocking stage in a daemon thread; returns an asyncio.Event that is set when it returns."""
+    done = asyncio.Event()
+
+    def run():
         try:
-            df = pd.read_csv(idea_pairs_path)
-            if df.shape[1] >= 2:  # Ensure at least two columns exist
-                new_df = pd.DataFrame()
-                new_df["manually extracted ideas"] = ""
-                new_df["automatically extracted ideas"] = df.iloc[:, 1]
-                new_df["codes"] = ""
-                
-                # Save as 'idea_comparison.csv'
-                new_df.to_csv(idea_comparison_path, index=False)
-                print(f"✅ Created {idea_comparison_path}")
-            else:
-                print(f"⚠️ Skipping 'idea_comparison.csv': Not enough columns in 'idea_pairs.csv'.")
+            target(*args)
+        finally:
+            try:
+                loop.call_soon_threadsafe(done.set)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+    threading.Thread(target=run, daemon=True).start()
+    return done
+
+async def report_queue_depths(sessions):
+    """Prints queue depths while work is queued, to show which stage is the bottleneck, and new idea latencies."""
+    reported_versions = {session: 0 for session in sessions}
+    while True:
+        await asyncio.sleep(PIPELINE_REPORT_INTERVAL)
+        for session in sessions:
+            if session.pipeline is None:
+                continue
+            prefix = f"[{session.participant}] " if len(sessions) > 1 else ""
+            stream = session.microphone
+            audio_depth = stream.depth() if stream is not None else 0
+            dropped = stream.dropped_chunks if stream is not None else 0
+            if audio_depth or dropped or any(queued or busy for queued, busy in session.pipeline.depths().values()):
+                print(f"📊 {prefix}audio: {audio_depth} queued, {dropped} dropped | {session.pipeline.report()}")
+            version = session.latency_tracer.version()
+            if version != reported_versions[session]:
+                reported_versions[session] = version
+                summary = session.latency_tracer.report()
+                if summary:
+                    print(f"⏱️ {prefix}{summary}")
+
+
+async def report_startup(warmups):
+    """Prints how long importing and each startup step took once the clients are warmed up."""
+    loop = asyncio.get_running_loop()
+    for thread in warmups:
+        await loop.run_in_executor(None, thread.join, PREWARM_TIMEOUT)
+    print(f"🚀 Startup: imports {import_seconds:.2f} s | {startup_timer.report()}")
+
+def update_visualization(sessions, min_frame_interval=MIN_FRAME_INTERVAL):
+    """Redraws the plot of each session whenever it publishes new ideas or ratings.
+
+    All plots are drawn from this one thread, as GUI toolkits do not allow windows on several threads.
+    """
+    drawn_versions = {session: 0 for session in sessions}
+    version = 0
+    last_frame = 0.0
+    while not all(session.terminated for session in sessions):
+        try:
+            # Limit the frame rate, updates published in the meantime are drawn in one frame
+            remaining = last_frame + min_frame_interval - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            new_version, _ = plot_updates.wait(version, timeout=GUI_EVENT_INTERVAL)
+            if new_version == version:
+                # Nothing new: keep the windows responsive without redrawing
+                if not HEADLESS:
+                    for session in sessions:
+                        session.flush_events()
+                continue
+            version = new_version
+
+            for session in sessions:
+                session_version, update = session.rating_updates.latest()
+                if session_version != drawn_versions[session]:
+                    drawn_versions[session] = session_version
+                    session.render(update, show_participant=len(sessions) > 1)
+            last_frame = time.monotonic()
         except Exception as e:
-            print(f"❌ Error processing 'idea_pairs.csv': {e}")
+            print(f"Unexpected error: {e}")
 
-    # Move the timestamped folder into the "data" folder
-    data_folder = os.path.join(os.getcwd(), "data")
-    os.makedirs(data_folder, exist_ok=True)
-    try:
-        final_destination = os.path.join(data_folder, timestamp)
-        shutil.move(folder_path, final_destination)
-        print(f"✅ Moved folder {folder_path} to {final_destination}")
-    except Exception as e:
-        print(f"❌ Error moving folder to 'data': {e}")
-        # Prevent deletion if move fails
-        return
+class Session:
+    """
+    One participant's session: microphone, transcripts and ideas, ratings, plot and session folder.
+
+    Several sessions can run in one process, each on its own input device; they share the service
+    clients (speech, OpenAI, SemDis) and the rating cache.
+    """
+    def __init__(self, participant=None, item=None, input_device_index=None, session_name=None, data_folder=None, audio_stream=None):
+        self.participant = participant or PARTICIPANT_NUMBERS
+        self.item = item or TASK_ITEM
+        self.input_device_index = INPUT_DEVICE_INDEX if input_device_index is None else input_device_index
+        self.title = "Alternative uses for a " + self.item
+        self.ideas_list = []
+        self.transcripts_list = []
+        # All SemDis ratings of the session, merged as new ideas are rated
+        self.ratings_store = RatingsStore()
+        # Published whenever ideas or ratings change; the visualization redraws only on updates
+        self.rating_updates = UpdateChannel()
+        # Every new transcript, idea and rating as a JSON-ready dict, for the clients of session_server.py
+        self.events = EventLog()
+        # Timestamps of each transcript and idea from the final STT result to the first plotted rating
+        self.latency_tracer = LatencyTracer()
+        # Cache of ratings from earlier sessions, opened on first use so that creating a session touches no files
+        self._rating_cache = None
+        # Extraction started on stable interim transcripts, with its outcomes
+        self.speculation = SpeculationTracker(SPECULATION_MIN_STABILITY, SPECULATION_MIN_WORDS) if SPECULATIVE_EXTRACTION else None
+        # Number of unique ideas already written to idea_pairs.csv
+        self.saved_ideas_count = 0
+        self.save_lock = threading.Lock()
+        # Set to stop the session
+        self.terminated = False
+        # Audio source other than the microphone, e.g. audio sent over the network
+        self.audio_stream = audio_stream
+        # Microphone stream of the running speech recognition, closed on shutdown
+        self.microphone = None
+        # Extraction and scoring stages, for queue reports and benchmarks
+        self.pipeline = None
+        self.loop = None
+        # Set once the pipeline runs and add_transcript() can be called
+        self.ready = threading.Event()
+        self.renderer = None
+        self.frame_recorder = None
 
-    # Delete the original files after successful folder move
-    for file in successfully_copied:
+        # Transcripts, ideas and ratings are appended to the session folder as they happen
+        # Seconds in the name keep a session restarted after a crash out of the crashed session's folder
+        session_name = session_name or datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + "_" + self.participant + "_" + self.item
+        self.store = SessionStore(os.path.join(data_folder or DATA_FOLDERNAME, session_name),
+                                  participant=self.participant, item=self.item)
+        frames_folder = os.path.join(self.store.folder, FRAMES_FOLDERNAME)
+        if os.path.exists(frames_folder):
+            shutil.rmtree(frames_folder)
+        print(f"Recording session to {self.store.folder}")
+
+    def publish_ratings(self, ideas_list):
+        """Publishes the current ideas and merged ratings to the visualization."""
         try:
-            os.remove(file)
-            print(f"🗑️ Deleted original file: {file}")
+            ideas, ratings = self.ratings_store.ideas_and_ratings()
+            self.rating_updates.publish((list(ideas_list), ideas, ratings))
+            plot_updates.publish(self)
         except Exception as e:
-            print(f"❌ Error deleting {file}: {e}")
+            print(f"Error publishing ratings: {e}")
 
-def escape_key_listener(microphone_stream, transcripts_list):
-    """Waits for the ESC key press to terminate the program."""
+    def publish_event(self, event_type, **fields):
+        """Adds an event with the wall-clock time it happened (clients on other hosts have no common monotonic clock)."""
+        self.events.append({"type": event_type, "time": time.time(), **fields})
 
-    global terminate_program
-    keyboard.wait("esc")  # Wait for ESC key press
-    print("\nESC pressed. Stopping everything...\n")
+    def publish_rating_events(self, header, rows, pairs):
+        # Rows are matched to the rated pairs as in RatingsStore.merge
+        if len(pairs) != len(rows):
+            pairs = [(row[0], row[1]) for row in rows]
+        column = header[2] if len(header) > 2 else None
+        for (_, idea), row in zip(pairs, rows):
+            self.publish_event("rating", idea=idea, rating=parse_rating(row[2]) if len(row) > 2 else None, column=column)
 
-    archive_session_data(transcripts_list)
-    
-    # Set flag to stop all loops
-    terminate_program = True
+    def add_transcript(self, transcript, final_time=None):
+        """Records a final transcript and queues it for extraction; safe to call from any thread."""
+        # Recorded before extraction, so a crash cannot lose transcripts still queued
+        self.store.add_transcripts([transcript])
+        self.publish_event("transcript", text=transcript)
+        if self.speculation is not None:
+            # Scheduled like the speculative requests, so it sees the ones started on this transcript's interim results
+            self.loop.call_soon_threadsafe(self.speculation.resolve, transcript)
+        self.pipeline.put_threadsafe((transcript, time.monotonic() if final_time is None else final_time), self.loop)
 
-    # Stop the microphone stream safely
-    try:
-        microphone_stream.closed = True
-        if microphone_stream._audio_stream.is_active():
-            microphone_stream._audio_stream.stop_stream()
-        microphone_stream._audio_stream.close()
-        microphone_stream._audio_interface.terminate()
-    except Exception as e:
-        print(f"Error closing microphone stream: {e}")
+    def add_interim(self, transcript, stability):
+        """Starts a speculative extraction request on a stable interim transcript; safe to call from any thread."""
+        self.loop.call_soon_threadsafe(self._speculate, transcript, stability)
+
+    @property
+    def rating_cache(self):
+        """The rating cache, opened on first use and closed by archive()."""
+        if self._rating_cache is None:
+            self._rating_cache = RatingCache(RATING_CACHE_FILE, backend=SCORING_BACKEND)
+        return self._rating_cache
 
-    # Exit the program forcefully if necessary
-    sys.exit(0)
+    def save_ideas_to_csv(self, ideas_list):
+        """Appends new unique ideas to the session's idea_pairs.csv and rates the ones SemDis has not rated yet."""
+        if not ideas_list:
+            print("No ideas to save!")
+            return
 
+        # Remove potential duplicates before saving
+        unique_ideas = list(dict.fromkeys(ideas_list))
 
-def main():
-    print("\nStarting new idea extraction session...\n")
+        with self.save_lock:
+            # Append only the item-idea pairs that are not in the CSV yet
+            new_ideas = unique_ideas[self.saved_ideas_count:]
+            if new_ideas:
+                self.store.add_ideas(self.item, new_ideas)
+                self.saved_ideas_count = len(unique_ideas)
+                print(f"Ideas saved to {IDEA_PAIRS_FILENAME}!")
+                # Show new ideas as pending until they are rated
+                self.publish_ratings(ideas_list)
 
-    # Reset files
-    if os.path.exists(IDEA_PAIRS_FILENAME):
-        os.remove(IDEA_PAIRS_FILENAME)
-    with open(RATINGS_FILENAME, mode="w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        # Write header
-        writer.writerow(["item", "response"])
-    print("Files reset successfully.")
-
-    global terminate_program
-    client = SpeechClient(credentials=credentials)
-    ideas_list = []
-    transcripts_list = []
-
-    # Start visualization thread
-    visualization_thread = threading.Thread(target=update_visualization, args=(ideas_list,), daemon=True)
-    visualization_thread.start()
-    print("Visualization started.")
+            # Only rate ideas without a rating (new ones and ones whose rating failed before)
+            unrated_pairs = self.ratings_store.missing((self.item, idea) for idea in unique_ideas)
+            if not unrated_pairs:
+                return
+
+            # Ideas rated in earlier sessions are shown right away, only cache misses are sent to SemDis
+            scorer = scorer_identity()
+            try:
+                header, rows, cached_pairs, unrated_pairs = self.rating_cache.get_many(unrated_pairs, backend=scorer)
+                if rows:
+                    self.latency_tracer.mark([idea for _, idea in cached_pairs], "cached")
+                    self.ratings_store.merge(header, rows, cached_pairs)
+                    self.publish_ratings(ideas_list)
+                    self.publish_rating_events(header, rows, cached_pairs)
+                    self.store.add_ratings(header, rows)
+                    print(f"⚡ {len(rows)} idea(s) rated from cache.")
+            except Exception as e:
+                print(f"❌ Error reading rating cache: {e}")
+            if not unrated_pairs:
+                return
+
+            # Rate ideas with SemDis
+            try:
+                print(f"\nRating {len(unrated_pairs)} new idea(s) with SemDis ({SCORING_BACKEND})...")
+                unrated_ideas = [idea for _, idea in unrated_pairs]
+                self.latency_tracer.mark(unrated_ideas, "semdis_upload")
+                header, rows = get_service("scorer").rate(unrated_pairs)
+                self.latency_tracer.mark(unrated_ideas, "semdis_download")
+                self.ratings_store.merge(header, rows, unrated_pairs)
+                self.publish_ratings(ideas_list)
+                self.publish_rating_events(header, rows, unrated_pairs)
+                # Keep ratings.csv up to date for the session archive
+                self.store.add_ratings(header, rows)
+                print_ratings(header, rows)
+                print("\nSemDis ratings updated successfully!\n")
+            except Exception as e:
+                print(f"❌ Error rating ideas with SemDis: {e}")
+                return
+
+            try:
+                self.rating_cache.put_many(header, rows, unrated_pairs, backend=scorer)
+            except Exception as e:
+                print(f"❌ Error writing rating cache: {e}")
+
+    def render(self, update, show_participant=False):
+        """Draws a published update; called from the render thread only."""
+        ideas_list, ideas, ratings = update
+        size = visualization_size
+        # Ensure lists match in size
+        ratings_filled = fill_list(ratings, size)
+        ideas_filled = fill_list(ideas, size)
+
+        # The renderer creates its artists once and only updates them afterwards
+        if self.renderer is None:
+            from plotter import LivePlotRenderer, FrameRecorder, use_headless_backend
+            if HEADLESS:
+                use_headless_backend()
+            x_vec = np.linspace(0,1,size+1)[0:-1]
+            title = f"{self.title} ({self.participant})" if show_participant else self.title
+            self.renderer = LivePlotRenderer(x_vec, title=title, interactive=not HEADLESS)
+            if HEADLESS:
+                self.frame_recorder = FrameRecorder(self.renderer.fig, os.path.join(self.store.folder, FRAMES_FOLDERNAME), max_fps=HEADLESS_MAX_FPS)
+        self.renderer.update(ratings_filled, ideas_filled, ideas_list, ratings)
+        if self.frame_recorder is not None:
+            self.frame_recorder.capture()
+        self.latency_tracer.mark(ideas, "rendered")
+
+    def flush_events(self):
+        if self.renderer is not None:
+            self.renderer.flush_events()
+
+    def run_speech_recognition(self, on_transcript, on_interim=None):
+        """Streams microphone audio to speech recognition until the session ends.
+
+        The microphone records into a ring buffer for the whole session; it opens while the speech client is
+        still connecting, and the audio recorded meanwhile is sent once the client is ready. Ahead of the stream time limit a
+        new stream is started while the old one winds down, replaying the audio after the old stream's last
+        final result, so sessions of any length run without gaps.
+        """
+        # Replayed transcripts need no microphone
+        if self.audio_stream is not None:
+            audio_stream = self.audio_stream
+        elif SPEECH_BACKEND == "replay":
+            from fake_servers import SilentAudioStream
+            audio_stream = SilentAudioStream(RATE, CHUNK)
+        else:
+            audio_stream = MicrophoneStream(RATE, CHUNK, input_device_index=self.input_device_index)
+        gate = None
+        try:
+            with audio_stream as stream:
+                self.microphone = stream
+                startup_timer.mark(f"microphone {self.participant}")
+                print(f"\n🎤 Now listening to {self.participant}...\n")
+                start = stream.buffer.position()
+                # Waits if the client is still being created by prewarm_services()
+                speech_client = get_service("speech")
+                if VAD_ENABLED:
+                    gate = VoiceActivityGate(RATE, stream.chunk_seconds, VAD_HANGOVER_SECONDS, VAD_PREROLL_SECONDS, VAD_KEEPALIVE_SECONDS)
+                while not self.terminated:
+                    if gate is not None:
+                        gate.reset()
+                    recognition = RecognitionStream(speech_client, stream, start, on_transcript, gate,
+                                                    stopped=lambda: self.terminated, on_interim=on_interim)
+                    thread = threading.Thread(target=recognition.run, daemon=True)
+                    thread.start()
+                    thread.join(STREAM_ROTATE_SECONDS)
+                    if thread.is_alive():
+                        # The old stream keeps running until it has answered its last requests
+                        start = recognition.retire()
+                        replay = (stream.buffer.position() - start) * stream.chunk_seconds
+                        print(f"\n🔄 Rotating speech stream, replaying {replay:.1f} s of audio.\n")
+                        continue
+                    if recognition.error is not None and not self.terminated:
+                        import google.api_core.exceptions
+                        if isinstance(recognition.error, google.api_core.exceptions.OutOfRange):
+                            print(f"\nStream duration exceeded (5 min limit). Restarting...\nException: {recognition.error}")
+                        else:
+                            print(f"Unexpected error: {recognition.error}")
+                            break
+                    if getattr(speech_client, "exhausted", False):
+                        print("\n🎞️ All recorded transcripts replayed.\n")
+                        break
+                    start = recognition.retire()
+        except Exception as e:
+            if not self.terminated:
+                print(f"Unexpected error: {e}")
+        finally:
+            self.microphone = None
+            if gate is not None and gate.chunks:
+                print(f"🔇 Voice activity detection held back {gate.suppressed_fraction:.0%} of the audio "
+                      f"({gate.suppressed * CHUNK / RATE:.0f} of {gate.chunks * CHUNK / RATE:.0f} s).")
 
-    while not terminate_program:
+    def stop_microphone(self):
+        """Stops the microphone stream safely, which ends the speech stream."""
+        stream = self.microphone
+        if stream is None:
+            return
         try:
-            with MicrophoneStream(RATE, CHUNK) as stream:
-                # Start escape key listener thread
-                escape_thread = threading.Thread(target=escape_key_listener, args=(stream, transcripts_list), daemon=True)
-                escape_thread.start()
-
-                print("\n🎤 Now listening...\n")
-
-                audio_generator = stream.generator()
-                responses = client.streaming_recognize(
-                    StreamingRecognitionConfig(config=RecognitionConfig(
-                        encoding=RecognitionConfig.AudioEncoding.LINEAR16,
-                        sample_rate_hertz=RATE,
-                        language_code="en-US",
-                    ), interim_results=True), 
-                    (StreamingRecognizeRequest(audio_content=content) for content in audio_generator)
-                )
-
-                listen_print_loop(responses, ideas_list, transcripts_list)
-
-        except google.api_core.exceptions.OutOfRange as e:
-            print(f"\nStream duration exceeded (5 min limit). Restarting...\nException: {e}")
-            continue  # Restarts the loop safely
-
-        except KeyboardInterrupt as e:
-            print(f"Keyboard Interrupt: {e}")
-            terminate_program = True
-            break  # Exit loop safely
+            stream.stop()
+        except Exception as e:
+            print(f"Error closing microphone stream: {e}")
+
+    def create_pipeline(self, loop, llm_concurrency=MAX_LLM_REQUESTS_IN_FLIGHT, coalesce_transcripts=True):
+        """Creates the extraction and scoring stages, which fill ideas_list and transcripts_list.
+
+        Items are (transcript, final STT time) tuples. With coalesce_transcripts, transcripts that queued up
+        during a request are sent together in the next one; otherwise each transcript gets its own request.
+        """
+        ideas_list, transcripts_list = self.ideas_list, self.transcripts_list
+        # Accepted ideas, searched for the ones relevant to each prompt
+        idea_index = IdeaIndex()
+        # Accepted ideas, for near-duplicate checks
+        dedup_index = create_dedup_index()
+        transcript_window = create_transcript_window()
+
+        def accept(candidates, batch, timings):
+            """Adds the candidates that are new ideas to ideas_list; returns them."""
+            # Filtering runs on the event loop, so concurrent requests cannot add the same idea twice
+            new_ideas = filter_new_ideas(candidates, ideas_list, dedup_index)
+            if not new_ideas:
+                return []
+            # An idea may come from any transcript of the batch; timing it from the earliest one gives an upper bound
+            first_final = min(final_time for _, final_time in batch)
+            for idea in new_ideas:
+                self.latency_tracer.add("idea", idea, stt_final=first_final, **timings)
+            for idea in new_ideas:
+                self.publish_event("idea", idea=idea, index=len(ideas_list))
+                ideas_list.append(idea)
+            idea_index.add(new_ideas)
+            dedup_index.add(new_ideas)
+            print(f"💡 New ideas: {new_ideas}")
+            print(f"📄 Ideas List: {ideas_list}")
+            return new_ideas
+
+        def speculate(transcript, stability):
+            if not self.speculation.should_start(transcript, stability):
+                return
+            # The request the final transcript would get, sent ahead of it
+            window = transcript_window.select(transcripts_list + [transcript], 1)
+            timings = {}
+            future = loop.run_in_executor(None, send_to_chatgpt, list(ideas_list), window, len(window), idea_index, dedup_index, timings, self.item)
+            self.speculation.start(Speculation(transcript, future, timings))
+            print(f"🔮 Speculating on: {transcript}")
+
+        self._speculate = speculate
+
+        async def accept_streamed(idea, batch, timings):
+            # Each streamed idea is scored right away instead of after the whole answer
+            new_ideas = accept([idea], batch, timings)
+            if new_ideas:
+                await self.pipeline.stages[-1].put(list(ideas_list))
+            return new_ideas
+
+        async def extract(batch):
+            # Transcripts that queued up during the previous request are sent together
+            transcripts = [transcript for transcript, _ in batch]
+            transcripts_list.extend(transcripts)
+            sent_until = len(transcripts_list)
+            window = transcript_window.select(transcripts_list, len(transcripts))
+            timings = {}
+            if self.speculation is not None:
+                requested = time.monotonic()
+                outcomes = [self.speculation.take(transcript) for transcript in transcripts]
+                found = False
+                for outcome, speculation in outcomes:
+                    if speculation is None:
+                        continue
+                    candidates = await speculation.future
+                    self.speculation.record_saved(speculation, requested)
+                    found = bool(accept(candidates, batch, speculation.timings)) or found
+                if all(outcome == "reused" for outcome, _ in outcomes):
+                    # The speculative request saw exactly these transcripts, so it needs no new request
+                    transcript_window.extracted(sent_until, found)
+                    for transcript, final_time in batch:
+                        self.latency_tracer.add("transcript", transcript, stt_final=final_time, **outcomes[0][1].timings)
+                    return [list(ideas_list)] if found else None
+                if found:
+                    # The ideas from the speculation are scored while the rest of the transcript is extracted
+                    await self.pipeline.stages[-1].put(list(ideas_list))
+                # Of an extended speculation only the words added after it are sent
+                new = [remainder(transcript, speculation) if outcome == "extended" else transcript
+                       for transcript, (outcome, speculation) in zip(transcripts, outcomes)]
+                if all(speculation is not None for _, speculation in outcomes):
+                    # The speculative requests already sent the earlier transcripts and the reused ones
+                    window = [text for text, (outcome, _) in zip(new, outcomes) if outcome == "extended"]
+                else:
+                    window = window[:-len(transcripts)] + new
+            on_idea = None
+            streamed = []
+            if STREAM_COMPLETIONS:
+                def on_idea(idea, arrived):
+                    # Called from the request's thread, which waits while the scoring queue is full
+                    streamed.extend(asyncio.run_coroutine_threadsafe(accept_streamed(idea, batch, dict(timings, llm_end=arrived)), loop).result())
+            candidates = await loop.run_in_executor(None, send_to_chatgpt, list(ideas_list), window, len(window), idea_index, dedup_index, timings, self.item, on_idea)
+            # Streamed ideas were accepted as they arrived
+            new_ideas = streamed if STREAM_COMPLETIONS else accept(candidates, batch, timings)
+            transcript_window.extracted(sent_until, bool(new_ideas))
+            for transcript, final_time in batch:
+                self.latency_tracer.add("transcript", transcript, stt_final=final_time, **timings)
+            if STREAM_COMPLETIONS or not new_ideas:
+                return None
+            return [list(ideas_list)]
+
+        async def score(snapshots):
+            # Every snapshot contains the earlier ones, so only the latest one is saved and rated
+            await loop.run_in_executor(None, self.save_ideas_to_csv, snapshots[-1])
+
+        self.pipeline = Pipeline([
+            Stage("extraction", extract if coalesce_transcripts else lambda item: extract([item]),
+                  concurrency=llm_concurrency, queue_size=TRANSCRIPT_QUEUE_SIZE, batch=coalesce_transcripts),
+            Stage("scoring", score, concurrency=1, queue_size=IDEA_QUEUE_SIZE, batch=True),
+        ])
+        return self.pipeline
+
+    async def run(self, shutdown, listen=True):
+        """Runs the session as stages connected by bounded queues: audio → STT → extraction → scoring → render.
+
+        Stops when shutdown is set or speech recognition ends, once queued work has finished. Without
+        listen there is no speech recognition; transcripts come from add_transcript() until shutdown.
+        """
+        loop = self.loop = asyncio.get_running_loop()
+        pipeline = self.create_pipeline(loop)
+        pipeline.start()
+        self.ready.set()
+        # Draw the empty plot
+        self.publish_ratings(self.ideas_list)
+
+        # Audio and STT stages: the blocking gRPC stream feeds the pipeline, waiting while extraction is full
+        shutdown_wait = asyncio.create_task(shutdown.wait())
+        waits = [shutdown_wait]
+        if listen:
+            stt_done = start_thread_stage(loop, self.run_speech_recognition, self.add_transcript,
+                                          self.add_interim if self.speculation is not None else None)
+            stt_wait = asyncio.create_task(stt_done.wait())
+            waits.append(stt_wait)
+
+        # Run until ESC, or until speech recognition stops on an error
+        await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        shutdown_wait.cancel()
+
+        # Shut down: stop listening and let queued work finish
+        self.terminated = True
+        self.stop_microphone()
+        if listen:
+            try:
+                await asyncio.wait_for(stt_wait, STT_STOP_TIMEOUT)
+            except asyncio.TimeoutError:
+                print("⚠️ Speech stream did not close in time.")
+        if not await pipeline.drain(SHUTDOWN_DRAIN_TIMEOUT):
+            print(f"⚠️ Cancelled work still queued after {SHUTDOWN_DRAIN_TIMEOUT} s: {pipeline.report()}")
+
+    def archive(self):
+        """Finishes the session folder: adds the latency traces and plot frames and marks the session as finished.
+
+        Transcripts, ideas and ratings were already appended to the folder during the session.
+        """
+        folder_path = self.store.folder
 
+        if self._rating_cache is not None:
+            cache_stats = self._rating_cache.stats()
+            print(f"Rating cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
+            self._rating_cache.close()
+            self._rating_cache = None
+
+        # Save the per-idea latency traces and their percentiles
+        try:
+            self.latency_tracer.write(folder_path)
+            print(f"✅ Saved latency summary to {LATENCY_SUMMARY_FILENAME}")
         except Exception as e:
-            print(f"Unexpected error: {e}")
-            break
+            print(f"❌ Error saving latency traces: {e}")
+
+        # Finish the headless frame recording, which was saved into the session folder
+        if self.frame_recorder is not None:
+            try:
+                timeline = self.frame_recorder.finish(HEADLESS_TIMELINE_FORMAT)
+                print(f"✅ Saved {len(self.frame_recorder.frame_times)} frames" + (f" and {os.path.basename(timeline)}" if timeline else ""))
+            except Exception as e:
+                print(f"❌ Error saving plot frames: {e}")
+
+        details = {}
+        if self.speculation is not None:
+            print(f"🔮 Speculation: {self.speculation.report()}")
+            details["speculation"] = self.speculation.stats()
+        try:
+            self.store.finalize(**details)
+            print(f"✅ Saved {self.store.transcripts} transcripts, {self.store.ideas} ideas and "
+                  f"{self.store.ratings} ratings to {folder_path}")
+        except Exception as e:
+            print(f"❌ Error finishing session folder: {e}")
+        self.publish_event("end", folder=folder_path)
+        self.events.close()
+
+async def run_sessions(sessions):
+    """Runs sessions side by side until ESC, then archives them; they share the clients and the plot thread."""
+    loop = asyncio.get_running_loop()
+    shutdown = asyncio.Event()
+
+    # Credentials are loaded and connections opened in parallel with the microphones and the plot
+    startup_timer.restart()
+    warmups = prewarm_services() if PREWARM_SERVICES else []
+
+    # Render stage: redraws from the latest-value channels, so it never holds up scoring
+    render_done = start_thread_stage(loop, update_visualization, sessions)
+    print("Visualization started.")
+    threading.Thread(target=escape_key_listener, args=(loop, shutdown), daemon=True).start()
+    monitor = asyncio.create_task(report_queue_depths(sessions))
+    startup_report = asyncio.create_task(report_startup(warmups))
+
+    await asyncio.gather(*(session.run(shutdown) for session in sessions))
+    monitor.cancel()
+    startup_report.cancel()
+    await render_done.wait()
+
+    for session in sessions:
+        session.archive()
+    close_services()
+
+
+# Time spent importing this module and its dependencies
+import_seconds = time.perf_counter() - import_started
+
+def main():
+    """Runs one session, or one per entry of SESSIONS; returns the finished sessions."""
+    print("\nStarting new idea extraction session...\n")
+    # Sessions that crashed still have everything recorded until the crash
+    for folder, counts in recover_sessions(DATA_FOLDERNAME):
+        print(f"♻️ Recovered unfinished session {os.path.basename(folder)}: {counts['transcripts']} transcripts, "
+              f"{counts['ideas']} ideas, {counts['ratings']} ratings")
+    sessions = [Session(participant, item, input_device_index)
+                for participant, item, input_device_index in SESSIONS or [(PARTICIPANT_NUMBERS, TASK_ITEM, INPUT_DEVICE_INDEX)]]
+
+    try:
+        asyncio.run(run_sessions(sessions))
+    except KeyboardInterrupt as e:
+        print(f"Keyboard Interrupt: {e}")
 
     print("👋 Exiting program. Goodbye!")
+    return sessions
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,86 @@
+import re
+import threading
+import zlib
+import numpy as np
+
+# Size of the hashed feature space for words and character trigrams
+FEATURE_DIM = 4096
+
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def _features(text):
+    """Returns hashed word and character-trigram features of a text."""
+    words = _WORD_PATTERN.findall(text.lower())
+    features = [f"w:{word}" for word in words]
+    for word in words:
+        padded = f" {word} "
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+def embed(texts, dim=FEATURE_DIM):
+    """Embeds texts as L2-normalized hashed bag-of-features vectors, one row per text."""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            # crc32 is stable across processes, unlike hash()
+            matrix[row, zlib.crc32(feature.encode("utf-8")) % dim] += 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class IdeaIndex:
+    """Growing index of accepted ideas that returns the ones most similar to a text."""
+    def __init__(self, dim=FEATURE_DIM, capacity=64):
+        self.dim = dim
+        self.ideas = []
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ideas)
+
+    def add(self, ideas):
+        """Adds accepted ideas to the index."""
+        ideas = list(ideas)
+        if not ideas:
+            return
+        vectors = embed(ideas, self.dim)
+        with self._lock:
+            needed = len(self.ideas) + len(ideas)
+            if needed > len(self._vectors):
+                # Grow geometrically so adding stays amortized O(1) per idea
+                grown = np.zeros((max(needed, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+                grown[:len(self.ideas)] = self._vectors[:len(self.ideas)]
+                self._vectors = grown
+            self._vectors[len(self.ideas):needed] = vectors
+            self.ideas.extend(ideas)
+
+    def most_similar(self, text, k):
+        """Returns up to k ideas ordered by similarity to the text, most similar first."""
+        query = embed([text], self.dim)[0]
+        with self._lock:
+            count = len(self.ideas)
+            if count == 0 or k <= 0:
+                return []
+            scores = self._vectors[:count] @ query
+            ideas = list(self.ideas)
+        if k < count:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(count)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [ideas[i] for i in top]
+
+
+def select_prior_ideas(index, text, max_ideas, max_chars):
+    """Picks the prior ideas for a prompt: the most similar ones within an idea and character budget."""
+    selected, used = [], 0
+    for idea in index.most_similar(text, max_ideas):
+        cost = len(idea) + 2  # ", " separator
+        if used + cost > max_chars:
+            break
+        selected.append(idea)
+        used += cost
+    return selected
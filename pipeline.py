@@ -0,0 +1,123 @@
+import asyncio
+import collections
+import time
+
+# Handler call durations kept per stage; older ones are dropped so long sessions do not grow them
+STAGE_DURATIONS_KEPT = 1000
+
+
+class Stage:
+    """
+    One step of the pipeline: workers that take items from a bounded input queue and pass their
+    results on to the next stage, waiting while the next stage's queue is full (backpressure).
+
+    Parameters:
+    - name (str): Name used in queue depth reports
+    - handler (coroutine function): handler(item) -> list of outputs for the next stage (or None)
+    - concurrency (int, optional): Number of items handled at the same time (default: 1)
+    - queue_size (int, optional): Capacity of the input queue (default: 16)
+    - batch (bool, optional): Hand all queued items to the handler at once as a list (default: False)
+    """
+    def __init__(self, name, handler, concurrency=1, queue_size=16, batch=False):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.batch = batch
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.next = None
+        # Counters
+        self.processed = 0
+        self.busy = 0
+        self.max_depth = 0
+        # Seconds the latest handler calls took, including waiting for room in the next stage
+        self.durations = collections.deque(maxlen=STAGE_DURATIONS_KEPT)
+        self._workers = []
+
+    async def put(self, item):
+        """Queues an item, waiting while the queue is full."""
+        await self.queue.put(item)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def start(self):
+        self._workers = [asyncio.create_task(self._work(), name=f"{self.name}-{i}") for i in range(self.concurrency)]
+
+    async def stop(self):
+        """Cancels the workers, including work in progress."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self):
+        while True:
+            items = [await self.queue.get()]
+            if self.batch:
+                # Merge everything that queued up while the previous batch was handled
+                while not self.queue.empty():
+                    items.append(self.queue.get_nowait())
+            self.busy += 1
+            start = time.perf_counter()
+            try:
+                outputs = await self.handler(items if self.batch else items[0])
+                if outputs and self.next is not None:
+                    for output in outputs:
+                        await self.next.put(output)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error in {self.name} stage: {e}")
+            finally:
+                self.durations.append(time.perf_counter() - start)
+                self.busy -= 1
+                self.processed += len(items)
+                for _ in items:
+                    self.queue.task_done()
+
+
+class Pipeline:
+    """Stages connected by bounded queues, started, drained and cancelled together."""
+    def __init__(self, stages):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next = next_stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    async def put(self, item):
+        """Feeds an item into the first stage, waiting while it is full."""
+        await self.stages[0].put(item)
+
+    def put_threadsafe(self, item, loop):
+        """Feeds an item from another thread, blocking that thread while the first stage is full."""
+        asyncio.run_coroutine_threadsafe(self.put(item), loop).result()
+
+    async def _join(self):
+        # A stage is done once its queue is empty and every result was handed to the next stage
+        for stage in self.stages:
+            await stage.queue.join()
+
+    async def drain(self, timeout=None):
+        """Lets the stages finish all queued items in order, then stops them.
+
+        Returns False if the timeout passed and the remaining work was cancelled.
+        """
+        try:
+            await asyncio.wait_for(self._join(), timeout)
+            drained = True
+        except asyncio.TimeoutError:
+            drained = False
+        await self.cancel()
+        return drained
+
+    async def cancel(self):
+        for stage in self.stages:
+            await stage.stop()
+
+    def depths(self):
+        """Returns the number of queued and in-progress items per stage."""
+        return {stage.name: (stage.queue.qsize(), stage.busy) for stage in self.stages}
+
+    def report(self):
+        return " | ".join(f"{name}: {queued} queued, {busy} busy" for name, (queued, busy) in self.depths().items())
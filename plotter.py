@@ -4,12 +4,22 @@ warnings.filterwarnings("ignore", category=UserWarning, module="matplotlib")
 import matplotlib.pyplot as plt
 import numpy as np
 import textwrap
+import io
+import os
+import shutil
+import subprocess
+import threading
+import time
+from functools import lru_cache
+from PIL import Image
 
 # Looks better
 plt.style.use('ggplot')
 
 ANNOTATION_OFFSET_UP = 10
 ANNOTATION_OFFSET_DOWN = -25
+# Lines of the ideas panel that fit into the figure; lines below the figure edge are never visible
+IDEAS_PANEL_MAX_LINES = 45
 
 def position_annotations(y_data):
     # All annotations start with offset 0
@@ -63,6 +73,41 @@ def position_neighbors(positions, y_data):
         else: # already positioned
             continue
     
+def position_annotations_array(y_data):
+    """position_annotations on arrays: the vertical offset of each point's annotation, above peaks, below valleys, towards the further neighbor otherwise."""
+    y = np.asarray(y_data, dtype=float)
+    if len(y) == 0:
+        return []
+    # Mark peaks and valleys, the first and last point compare against themselves on the open side
+    left = np.concatenate((y[:1], y[:-1]))
+    right = np.concatenate((y[1:], y[-1:]))
+    positions = np.where((y >= left) & (y >= right), ANNOTATION_OFFSET_UP,
+                         np.where((y <= left) & (y <= right), ANNOTATION_OFFSET_DOWN, 0))
+    # Mark neighbors to peaks and valleys
+    position_neighbors_array(positions, y)
+    return positions.tolist()
+
+def position_neighbors_array(positions, y_data):
+    """position_neighbors on arrays: positions the remaining annotations in place, based on their neighbors."""
+    y = np.asarray(y_data, dtype=float)
+    if len(y) < 3:
+        return
+    pos = np.asarray(positions)
+    left, right = pos[:-2], pos[2:]
+    dif_left = np.abs(y[:-2] - y[1:-1])
+    dif_right = np.abs(y[2:] - y[1:-1])
+    # Only position when both neighbors are positioned, in the same direction as the further neighbor.
+    # Points set here never have a neighbor set in this step, so all points can be done at once.
+    inner = pos[1:-1].copy()
+    both_positioned = (inner == 0) & (left != 0) & (right != 0)
+    inner[both_positioned] = np.where(dif_left > dif_right, left, right)[both_positioned]
+    # Position the rest: shift the annotation towards the further neighbor
+    towards_left = np.where(y[:-2] > y[1:-1], ANNOTATION_OFFSET_UP, ANNOTATION_OFFSET_DOWN)
+    towards_right = np.where(y[2:] > y[1:-1], ANNOTATION_OFFSET_UP, ANNOTATION_OFFSET_DOWN)
+    rest = inner == 0
+    inner[rest] = np.where(dif_left > dif_right, towards_left, towards_right)[rest]
+    positions[1:-1] = inner.tolist() if isinstance(positions, list) else inner
+
 def split_into_two_lines(text):
     """Splits a string into two lines of approximately equal length."""
     words = text.split()
@@ -83,6 +128,33 @@ def split_into_two_lines(text):
             first_line.append(words.pop(0))
     return " ".join(first_line) + "\n" + " ".join(second_line)
 
+@lru_cache(maxsize=4096)
+def wrap_annotation(text):
+    """Cached split_into_two_lines, so each idea's label is laid out once."""
+    return split_into_two_lines(text)
+
+@lru_cache(maxsize=4096)
+def format_list_entry(idea, formatted_rating=None):
+    """Formats and wraps one entry of the ideas panel; pending ideas have no rating yet."""
+    if formatted_rating is not None:
+        list_entry = rf"$\bf{{{formatted_rating}}}$" + " " + idea + "\n"
+    else:
+        list_entry = r"$\mathit{(...)}$" + " " + idea + "\n"
+    return "\n".join(textwrap.wrap(list_entry, width=40)) + "\n"
+
+def ideas_panel_text(ideas_list, ratings_list, max_lines=IDEAS_PANEL_MAX_LINES):
+    """Builds the text of the ideas panel, stopping once it is longer than the figure."""
+    text_str = r"$\bf{EXTRACTED}$" + " " + r"$\bf{IDEAS}$" + "                    \n\n"
+    lines = 2
+    for i, idea in enumerate(ideas_list):
+        formatted_rating = f"{ratings_list[i]:.2f}" if i < len(ratings_list) else None
+        entry = format_list_entry(idea, formatted_rating)
+        text_str += entry
+        lines += entry.count("\n")
+        if max_lines is not None and lines >= max_lines:
+            break
+    return text_str
+
 def live_plotter(x_vec, y_data, ratings_line, ideas_list, ratings_list, idea_annotations=None, title="AUT for brick", t_pause=0.5):
     """
     Updates a live plot with new creativity ratings.
@@ -178,4 +250,222 @@ def live_plotter(x_vec, y_data, ratings_line, ideas_list, ratings_list, idea_ann
     plt.pause(t_pause)
 
     # Return 
-    return ratings_line
\ No newline at end of file
+    return ratings_line
+
+class LivePlotRenderer:
+    """
+    Live plot that creates its artists once and only updates them on each frame.
+
+    The line, the point annotations and the ideas panel are animated artists: a full canvas draw
+    happens only when the static parts change (first frame, resize, new y-limits). Every other frame
+    restores the cached background and blits the redrawn artists, so frame time does not depend on
+    how many ideas the session has produced.
+
+    Parameters:
+    - x_vec (numpy.ndarray): Fixed x-axis values
+    - title (str, optional): Title of the plot
+    - interactive (bool, optional): Open an interactive window (default: True)
+    """
+    def __init__(self, x_vec, title="AUT for brick", interactive=True):
+        self.x_vec = np.asarray(x_vec)
+        self.interactive = interactive
+        if interactive:
+            plt.ion()
+        self.fig = plt.figure(figsize=(13,6))
+        self.ax = self.fig.add_subplot(111)
+        # Set initial ylim range and hide x-axis labels
+        self.ax.set_ylim([0, 0.3])
+        self.ax.set_xticklabels([])
+        self.ax.set_ylabel('Creativity Rating')
+        self.ax.set_title(title)
+        # Add padding for annotations
+        padding = 0.1 * (self.x_vec[-1] - self.x_vec[0])  # 10% of the x-range
+        self.ax.set_xlim(self.x_vec[0] - padding, self.x_vec[-1] + padding)
+        self.fig.subplots_adjust(right=0.75)
+
+        self.line, = self.ax.plot(self.x_vec, np.zeros(len(self.x_vec)), '-o', animated=True)
+        self.annotations = [
+            self.ax.annotate(
+                "", (x, 0),
+                textcoords="offset points",
+                xytext=(0, 0),
+                ha='center',
+                fontsize=9,
+                fontweight='bold',
+                color='black',
+                visible=False,
+                animated=True
+            )
+            for x in self.x_vec
+        ]
+        self.ideas_text = self.ax.text(
+            1.05, 1.0, ideas_panel_text([], []),
+            transform=self.ax.transAxes,
+            fontsize=8,
+            horizontalalignment='left',  # Align left so text grows downward
+            verticalalignment='top',  # Start at the top
+            bbox=dict(boxstyle="round,pad=0.5", edgecolor='black', facecolor='white', linewidth=2),
+            animated=True
+        )
+        self._background = None
+        # Every full draw (also resizes by the window manager) refreshes the cached background
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        self.fig.canvas.draw()
+        if interactive:
+            plt.show(block=False)
+            self.fig.canvas.flush_events()
+
+    @property
+    def artists(self):
+        return [self.line, self.ideas_text, *self.annotations]
+
+    def _on_draw(self, event):
+        """Caches everything but the animated artists, then draws them on top."""
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+
+    def update(self, y_data, idea_annotations, ideas_list, ratings_list):
+        """
+        Draws one frame.
+
+        Parameters:
+        - y_data (list): Ratings of the plotted points
+        - idea_annotations (list): Text annotation for each point, 0 for no annotation
+        - ideas_list (list): All extracted ideas, shown in the ideas panel
+        - ratings_list (list): Ratings of the ideas that have been rated so far
+        """
+        y_data = np.asarray(y_data, dtype=float)
+        annotation_offsets = position_annotations_array(y_data)
+        self.line.set_ydata(y_data)
+
+        # Reuse the annotation artists, only their text and position change
+        for annotation, x, y, label, offset in zip(self.annotations, self.x_vec, y_data, idea_annotations, annotation_offsets):
+            if label == 0:
+                annotation.set_visible(False)
+                continue
+            annotation.set_visible(True)
+            wrapped_text = wrap_annotation(label)
+            if annotation.get_text() != wrapped_text:
+                annotation.set_text(wrapped_text)
+            annotation.xy = (x, y)
+            annotation.set_position((0, offset))
+
+        # Replace the panel text only if the visible part changed (its length is capped, so this stays cheap)
+        panel_text = ideas_panel_text(ideas_list, ratings_list)
+        if panel_text != self.ideas_text.get_text():
+            self.ideas_text.set_text(panel_text)
+
+        # Adjust boundaries if a rating is outside the range
+        full_draw = self._background is None or not self.fig.canvas.supports_blit
+        # (the axes are part of the cached background, so only redraw everything if they really change)
+        if len(y_data) and np.max(y_data)+0.1 > self.ax.get_ylim()[1]:
+            self.ax.set_ylim([0, np.max(y_data)+0.1])
+            full_draw = True
+
+        if full_draw:
+            self.fig.canvas.draw()
+        else:
+            self.fig.canvas.restore_region(self._background)
+            self._draw_artists()
+            self.fig.canvas.blit(self.fig.bbox)
+        if self.interactive:
+            self.fig.canvas.flush_events()
+
+    def flush_events(self):
+        """Processes GUI events without redrawing."""
+        self.fig.canvas.flush_events()
+
+
+def use_headless_backend():
+    """Switches matplotlib to the non-interactive Agg backend; call before creating a figure."""
+    plt.switch_backend("Agg")
+
+
+class FrameRecorder:
+    """
+    Captures rendered frames of a figure at a capped frame rate, without a GUI event loop.
+
+    Each frame is encoded as PNG in memory (latest_png, e.g. for streaming) and written to
+    output_dir. finish() can assemble all frames into a single GIF or MP4 timeline.
+
+    Parameters:
+    - figure (matplotlib.figure.Figure): Figure drawn by an Agg canvas
+    - output_dir (str): Folder for the PNG frames and the timeline
+    - max_fps (float, optional): Maximum number of captured frames per second (default: 2)
+    """
+    def __init__(self, figure, output_dir, max_fps=2.0):
+        self.figure = figure
+        self.output_dir = output_dir
+        self.min_interval = 1.0 / max_fps
+        self.latest_png = None
+        self.frame_times = []
+        self._last_capture = None
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def frame_path(self, index):
+        return os.path.join(self.output_dir, f"frame_{index:05d}.png")
+
+    def capture(self, force=False):
+        """Saves the current canvas as the next frame; returns False if skipped by the frame-rate cap."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._last_capture is not None and now - self._last_capture < self.min_interval:
+                return False
+            self._last_capture = now
+            # The Agg buffer already holds the composed frame, so no redraw is needed
+            image = Image.fromarray(np.asarray(self.figure.canvas.buffer_rgba()))
+            buffer = io.BytesIO()
+            image.save(buffer, format="png")
+            self.latest_png = buffer.getvalue()
+            with open(self.frame_path(len(self.frame_times)), "wb") as file:
+                file.write(self.latest_png)
+            self.frame_times.append(now)
+            return True
+
+    def _durations(self):
+        """Seconds each frame stays on screen; the last one is shown for one frame interval."""
+        times = self.frame_times
+        return [later - earlier for earlier, later in zip(times, times[1:])] + [self.min_interval]
+
+    def finish(self, timeline_format=None):
+        """Captures the final frame and writes a 'timeline.gif' or 'timeline.mp4' if requested."""
+        self.capture(force=True)
+        with self._lock:
+            if timeline_format == "gif":
+                return self._write_gif()
+            if timeline_format == "mp4":
+                return self._write_mp4()
+            return None
+
+    def _write_gif(self):
+        path = os.path.join(self.output_dir, "timeline.gif")
+        frames = [Image.open(self.frame_path(i)).convert("RGB") for i in range(len(self.frame_times))]
+        durations = [int(duration * 1000) for duration in self._durations()]
+        frames[0].save(path, save_all=True, append_images=frames[1:], duration=durations, loop=0)
+        return path
+
+    def _write_mp4(self):
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            print("⚠️ ffmpeg not found, keeping PNG frames only.")
+            return None
+        # The concat demuxer keeps the real time between frames
+        concat_path = os.path.join(self.output_dir, "frames.txt")
+        with open(concat_path, "w", encoding="utf-8") as file:
+            for i, duration in enumerate(self._durations()):
+                file.write(f"file '{os.path.basename(self.frame_path(i))}'\nduration {duration:.3f}\n")
+            # The last frame has to be listed twice for its duration to be used
+            file.write(f"file '{os.path.basename(self.frame_path(len(self.frame_times) - 1))}'\n")
+        path = os.path.join(self.output_dir, "timeline.mp4")
+        subprocess.run(
+            [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", concat_path,
+             "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", "-vsync", "vfr", path],
+            check=True
+        )
+        os.remove(concat_path)
+        return path
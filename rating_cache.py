@@ -0,0 +1,114 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+
+RATING_CACHE_FILENAME = "rating_cache.sqlite3"
+# Number of cached ratings kept before the least recently used ones are evicted
+RATING_CACHE_MAX_ENTRIES = 50000
+
+_NON_WORD = re.compile(r"[^a-z0-9']+")
+
+
+def normalize_response(response):
+    """Normalizes a response so that trivial variations share a cache entry."""
+    return " ".join(_NON_WORD.sub(" ", response.lower()).split())
+
+
+class RatingCache:
+    """
+    Disk-backed LRU cache of ratings keyed by (scorer, item, normalized response), shared across sessions.
+
+    The scorer identifies what produced the ratings: the backend, and for the local scorer also its word
+    vectors and composition, so changing the model never returns ratings of the old one. The cache keeps
+    at most max_entries ratings (a number of entries, not bytes).
+    """
+    def __init__(self, filename=RATING_CACHE_FILENAME, max_entries=RATING_CACHE_MAX_ENTRIES, backend="remote"):
+        self.filename = filename
+        self.max_entries = max_entries
+        # Default scorer identity; remote and local ratings are on different scales, so they are cached separately
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filename, check_same_thread=False, timeout=30)
+        # WAL lets several session processes read while one writes
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS ratings ("
+            "backend TEXT NOT NULL, item TEXT NOT NULL, response TEXT NOT NULL, "
+            "header TEXT NOT NULL, row TEXT NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (backend, item, response))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ratings_last_used ON ratings (last_used)")
+        self._connection.commit()
+
+    def get_many(self, pairs, backend=None):
+        """Looks up (item, response) pairs and returns the cached header, rows and the pairs that missed.
+
+        Cached rows are returned with the response text as given, in the order of the pairs. backend
+        overrides the scorer identity given to the constructor.
+        """
+        backend = backend or self.backend
+        header, rows, hit_pairs, missing = [], [], [], []
+        now = time.time()
+        with self._lock:
+            for item, response in pairs:
+                key = (backend, item, normalize_response(response))
+                found = self._connection.execute(
+                    "SELECT header, row FROM ratings WHERE backend = ? AND item = ? AND response = ?", key
+                ).fetchone()
+                if found is None:
+                    missing.append((item, response))
+                    continue
+                cached_header, cached_row = json.loads(found[0]), json.loads(found[1])
+                if header and cached_header != header:
+                    # Rows from different SemDis versions cannot be merged into one table
+                    missing.append((item, response))
+                    continue
+                header = cached_header
+                cached_row[0], cached_row[1] = item, response
+                rows.append(cached_row)
+                hit_pairs.append((item, response))
+                self._connection.execute(
+                    "UPDATE ratings SET last_used = ? WHERE backend = ? AND item = ? AND response = ?", (now, *key)
+                )
+            self._connection.commit()
+            self.hits += len(rows)
+            self.misses += len(missing)
+        return header, rows, hit_pairs, missing
+
+    def put_many(self, header, rows, pairs=None, backend=None):
+        """Stores rating rows, keyed by the given pairs or by the rows' own item and response."""
+        backend = backend or self.backend
+        if pairs is not None and len(pairs) != len(rows):
+            pairs = None
+        now = time.time()
+        encoded_header = json.dumps(list(header))
+        entries = []
+        for i, row in enumerate(rows):
+            item, response = pairs[i] if pairs is not None else (row[0], row[1])
+            entries.append((backend, item, normalize_response(response), encoded_header, json.dumps(list(row)), now))
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO ratings VALUES (?, ?, ?, ?, ?, ?)", entries)
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """Deletes the least recently used entries beyond the max_entries count."""
+        count = self._connection.execute("SELECT COUNT(*) FROM ratings").fetchone()[0]
+        if count > self.max_entries:
+            self._connection.execute(
+                "DELETE FROM ratings WHERE rowid IN (SELECT rowid FROM ratings ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        """Returns the hit and miss counters of this process."""
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
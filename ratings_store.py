@@ -0,0 +1,69 @@
+import threading
+from semdis_api import write_ratings, RATINGS_FILENAME
+
+
+def parse_rating(value):
+    """Converts a rating cell to a float; responses that could not be rated ("NA") count as 0."""
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+class RatingsStore:
+    """Local table of SemDis ratings keyed by (item, response), merged across updates."""
+    def __init__(self):
+        self._header = ["item", "response"]
+        # Dicts keep insertion order, so rows stay in the order ideas were rated
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def missing(self, pairs):
+        """Returns the (item, response) pairs that have not been rated yet, without duplicates."""
+        with self._lock:
+            return [pair for pair in dict.fromkeys(pairs) if pair not in self._rows]
+
+    def merge(self, header, rows, pairs=None):
+        """Adds rating rows to the table, replacing earlier ratings for the same pair.
+
+        If the uploaded pairs are given and SemDis returned one row per pair, rows are keyed by the
+        uploaded text so that any normalization on the server side cannot cause re-rating.
+        """
+        if pairs is not None and len(pairs) != len(rows):
+            pairs = None
+        with self._lock:
+            if len(header) >= len(self._header):
+                self._header = list(header)
+            for i, row in enumerate(rows):
+                key = pairs[i] if pairs is not None else (row[0], row[1])
+                self._rows[key] = list(row)
+
+    def header(self):
+        with self._lock:
+            return list(self._header)
+
+    def rows(self):
+        with self._lock:
+            return list(self._rows.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rows)
+
+    def ideas_and_ratings(self):
+        """Returns ideas and ratings (second and third column) in rating order."""
+        ideas, ratings = [], []
+        for row in self.rows():
+            ideas.append(row[1])
+            ratings.append(parse_rating(row[2]))
+        return ideas, ratings
+
+    def save(self, filename=RATINGS_FILENAME):
+        """Writes the merged table in the ratings.csv format."""
+        with self._lock:
+            write_ratings(self._header, self._rows.values(), filename)
+
+    def clear(self):
+        with self._lock:
+            self._header = ["item", "response"]
+            self._rows.clear()
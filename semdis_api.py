@@ -1,6 +1,9 @@
 import requests
 import uuid
 import csv
+import io
+import time
+import threading
 
 # Define URLs and file names
 SEMDIS_UPLOAD_URL = "https://cap.ist.psu.edu/semdis"
@@ -8,61 +11,149 @@ SEMDIS_DOWNLOAD_URL = "https://cap.ist.psu.edu/csvdownload"
 IDEA_PAIRS_FILENAME = "idea_pairs.csv"
 RATINGS_FILENAME = "ratings.csv"
 
-# Start a session to handle cookies
-session = requests.Session()
-
-# Step 1: Perform an initial GET request to fetch cookies and CSRF token
-response = session.get(SEMDIS_UPLOAD_URL)
-csrf_token = session.cookies.get("csrftoken")
-if not csrf_token:
-    print("CSRF token not found. Exiting.")
-    exit()
-
-# Step 2: Generate a unique progress_id
-progress_id = uuid.uuid4().hex
-
-# Step 3: Upload the CSV file
-with open(IDEA_PAIRS_FILENAME, "rb") as file:
-    files = {
-        "csrfmiddlewaretoken": (None, csrf_token),
-        "csv_file": (IDEA_PAIRS_FILENAME, file, "text/csv"),
-        "progress_id": (None, progress_id),
-    }
-    headers = {
-        "Referer": SEMDIS_UPLOAD_URL,
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36",
-    }
-    upload_response = session.post(SEMDIS_UPLOAD_URL, files=files, headers=headers)
-
-if upload_response.status_code == 200:
-    print("SemDis API: File uploaded successfully!")
-else:
-    print(f"SemDis API: Error during file upload: {upload_response.status_code}")
-    print("Details:", upload_response.text)
-    exit()
-
-# Step 4: Download the results
-download_response = session.get(SEMDIS_DOWNLOAD_URL)
-if download_response.status_code == 200:
-    with open(RATINGS_FILENAME, "wb") as result_file:
-        result_file.write(download_response.content)
-
-    # Print first three columns
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36"
+# Seconds to wait for SemDis before giving up on a request
+REQUEST_TIMEOUT = 60
+# Reuse a CSRF token for this long if the cookie does not say when it expires
+CSRF_TOKEN_MAX_AGE = 30 * 60
+
+
+class SemDisError(Exception):
+    """Raised when SemDis rejects an upload or the ratings cannot be downloaded."""
+
+
+def pairs_to_csv(pairs):
+    """Encodes (item, response) pairs as the CSV file SemDis expects."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["item", "response"])
+    for item, response in pairs:
+        writer.writerow([item, response])
+    return buffer.getvalue().encode("utf-8")
+
+
+def parse_ratings(content):
+    """Parses a downloaded SemDis CSV into its header and rating rows."""
+    text = content.decode("utf-8-sig") if isinstance(content, bytes) else content
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    if not rows:
+        return [], []
+    return rows[0], rows[1:]
+
+
+def write_ratings(header, rows, filename=RATINGS_FILENAME):
+    """Writes SemDis ratings to a CSV file."""
+    with open(filename, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def print_ratings(header, rows):
+    """Prints the first three columns of the SemDis ratings."""
+    if len(header) < 3:
+        return
+    # Print header with spacing
+    print(f"{header[0]:<10} {header[1]:<30} {header[2]:<15}")
+    print("-" * 60)
+    # Print first three columns with formatting
+    for row in rows:
+        print(f"{row[0]:<10} {row[1]:<30} {row[2]:<15}")
+
+
+class SemDisClient:
+    """Rates item-response pairs with SemDis over one persistent HTTP session."""
+    def __init__(self, upload_url=SEMDIS_UPLOAD_URL, download_url=SEMDIS_DOWNLOAD_URL, timeout=REQUEST_TIMEOUT):
+        self.upload_url = upload_url
+        self.download_url = download_url
+        self.timeout = timeout
+        # One session keeps the cookies and a pool of keep-alive connections
+        self._session = requests.Session()
+        self._session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._session.headers.update({"Referer": upload_url, "User-Agent": USER_AGENT})
+        self._csrf_token = None
+        self._csrf_expires = 0.0
+        # SemDis keeps the last upload per session cookie, so an upload and its download must not interleave
+        self._lock = threading.Lock()
+
+    def _fetch_csrf_token(self):
+        """Performs a GET request to fetch cookies and a fresh CSRF token."""
+        response = self._session.get(self.upload_url, timeout=self.timeout)
+        response.raise_for_status()
+        self._remember_csrf_token()
+        if not self._csrf_token:
+            raise SemDisError("CSRF token not found.")
+
+    def _remember_csrf_token(self):
+        """Stores the current CSRF cookie and when it expires."""
+        for cookie in self._session.cookies:
+            if cookie.name == "csrftoken":
+                self._csrf_token = cookie.value
+                if cookie.expires:
+                    self._csrf_expires = float(cookie.expires)
+                else:
+                    self._csrf_expires = time.time() + CSRF_TOKEN_MAX_AGE
+                return
+
+    def _csrf_token_valid(self):
+        return self._csrf_token is not None and time.time() < self._csrf_expires
+
+    def _upload(self, csv_content):
+        if not self._csrf_token_valid():
+            self._fetch_csrf_token()
+        files = {
+            "csrfmiddlewaretoken": (None, self._csrf_token),
+            "csv_file": (IDEA_PAIRS_FILENAME, csv_content, "text/csv"),
+            "progress_id": (None, uuid.uuid4().hex),
+        }
+        return self._session.post(self.upload_url, files=files, timeout=self.timeout)
+
+    def warm_up(self):
+        """Opens the connection and fetches the CSRF token ahead of the first upload."""
+        with self._lock:
+            if not self._csrf_token_valid():
+                self._fetch_csrf_token()
+
+    def rate(self, pairs):
+        """Uploads (item, response) pairs and returns the SemDis header and rating rows."""
+        pairs = list(pairs)
+        if not pairs:
+            return [], []
+        csv_content = pairs_to_csv(pairs)
+
+        with self._lock:
+            upload_response = self._upload(csv_content)
+            if upload_response.status_code == 403:
+                # Token was rejected before its cookie expired, fetch a new one and retry once
+                self._csrf_token = None
+                upload_response = self._upload(csv_content)
+            if upload_response.status_code != 200:
+                raise SemDisError(f"Error during file upload: {upload_response.status_code}\nDetails: {upload_response.text}")
+            self._remember_csrf_token()
+
+            download_response = self._session.get(self.download_url, timeout=self.timeout)
+            if download_response.status_code != 200:
+                raise SemDisError(f"Error downloading results: {download_response.status_code}\n{download_response.text}")
+
+        return parse_ratings(download_response.content)
+
+    def close(self):
+        self._session.close()
+
+
+if __name__ == "__main__":
+    # Rate idea_pairs.csv and save the results to ratings.csv
+    with open(IDEA_PAIRS_FILENAME, "r", newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        # Skip header
+        next(reader, None)
+        pairs = [(row[0], row[1]) for row in reader if len(row) >= 2]
+
     try:
-        with open(RATINGS_FILENAME, "r", encoding="utf-8") as file:
-            reader = csv.reader(file)
-            # Read header row
-            header = next(reader)
-            # Print header with spacing
-            print(f"{header[0]:<10} {header[1]:<30} {header[2]:<15}")
-            print("-" * 60)
-            
-            # Print first three columns with formatting
-            for row in reader:
-                print(f"{row[0]:<10} {row[1]:<30} {row[2]:<15}")  
-
-    except Exception as e:
-        print(f"SemDis API: Error reading CSV: {e}")
-else:
-    print(f"SemDis API: Error downloading results: {download_response.status_code}")
-    print(download_response.text)
+        header, rows = SemDisClient().rate(pairs)
+    except (SemDisError, requests.RequestException) as e:
+        print(f"SemDis API: {e}")
+        raise SystemExit(1)
+    print("SemDis API: File uploaded successfully!")
+    write_ratings(header, rows)
+    print_ratings(header, rows)
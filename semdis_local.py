@@ -0,0 +1,134 @@
+import re
+import unicodedata
+import numpy as np
+from embedding_store import MappedWordVectors, STORE_EXTENSION, read_text_vectors
+
+# Column name of the locally computed rating in ratings.csv
+LOCAL_RATING_COLUMN = "SemDis_local"
+# Words SemDis drops before composing multi-word responses
+STOPWORDS = frozenset("""
+a an the and or but if of at by for with about against between into through during before after above below
+to from up down in out on off over under again further then once here there when where why how all any both
+each few more most other some such no nor not only own same so than too very can will just should now
+as is are was were be been being have has had having do does did doing it its it's this that these those
+i me my we our you your he him his she her they them their what which who whom use used using
+""".split())
+
+# Letters of any script, so accented words such as "café" stay whole
+_WORD_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+
+def tokenize(text, remove_stopwords=True):
+    """Lowercases a response and splits it into words, dropping stopwords if requested."""
+    # Composed form, so an accent typed as a combining character does not split its word
+    words = _WORD_PATTERN.findall(unicodedata.normalize("NFC", text).lower())
+    if remove_stopwords:
+        kept = [word for word in words if word not in STOPWORDS]
+        # Keep responses made only of stopwords scoreable
+        return kept or words
+    return words
+
+
+class WordVectors:
+    """Word-vector model held in memory as a float32 matrix with a vocabulary index."""
+    normalized = False
+
+    def __init__(self, words, matrix):
+        self.index = {word: i for i, word in enumerate(words)}
+        self.matrix = np.asarray(matrix, dtype=np.float32)
+        self.dim = self.matrix.shape[1]
+
+    @classmethod
+    def load_text(cls, path):
+        """Loads a text vector file (GloVe, or word2vec/fastText text with a "count dim" header line)."""
+        words, rows = [], []
+        for word, vector in read_text_vectors(path):
+            words.append(word)
+            rows.append(vector)
+        return cls(words, np.vstack(rows))
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def indices(self, words):
+        """Returns the rows of the known words, skipping unknown ones."""
+        return [self.index[word] for word in words if word in self.index]
+
+    def rows(self, indices):
+        """Returns the vectors for the given rows as float32."""
+        return np.asarray(self.matrix[indices], dtype=np.float32)
+
+
+def load_word_vectors(path):
+    """Loads a word-vector model from disk; .semvec stores are memory-mapped instead of parsed."""
+    if path.endswith(STORE_EXTENSION):
+        return MappedWordVectors(path)
+    return WordVectors.load_text(path)
+
+
+class LocalSemDisScorer:
+    """Scores responses like SemDis: one minus the cosine between the item and the composed response vector."""
+    def __init__(self, vectors, composition="multiply", remove_stopwords=True):
+        if composition not in ("multiply", "add"):
+            raise ValueError(f"Unknown composition '{composition}', use 'multiply' or 'add'.")
+        self.vectors = load_word_vectors(vectors) if isinstance(vectors, str) else vectors
+        self.composition = composition
+        self.remove_stopwords = remove_stopwords
+
+    def compose(self, texts):
+        """Composes one vector per text; rows of texts without known words are NaN."""
+        composed = np.full((len(texts), self.vectors.dim), np.nan, dtype=np.float32)
+        segments, indices = [], []
+        for i, text in enumerate(texts):
+            known = self.vectors.indices(tokenize(text, self.remove_stopwords))
+            if known:
+                segments.append((i, len(indices)))
+                indices.extend(known)
+        if not segments:
+            return composed
+
+        # Reduce all word vectors at once, one segment per text
+        word_rows = self.vectors.rows(np.asarray(indices))
+        if self.composition == "multiply":
+            # Multiplicative composition works on unit vectors so that no single word dominates
+            if not self.vectors.normalized:
+                word_rows /= np.maximum(np.linalg.norm(word_rows, axis=1, keepdims=True), 1e-12)
+            reduce = np.multiply.reduceat
+        else:
+            reduce = np.add.reduceat
+        targets, starts = np.asarray(segments).T
+        composed[targets] = reduce(word_rows, starts, axis=0)
+        return composed
+
+    def distances(self, item, responses):
+        """Returns the semantic distance between the item and every response (NaN if not scoreable)."""
+        item_vector = self.compose([item])[0]
+        if np.isnan(item_vector).any():
+            raise ValueError(f"Task item '{item}' is not in the word-vector vocabulary.")
+        response_vectors = self.compose(list(responses))
+        item_vector /= max(np.linalg.norm(item_vector), 1e-12)
+        norms = np.linalg.norm(response_vectors, axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cosine = (response_vectors @ item_vector) / norms
+        return 1.0 - cosine
+
+    def rate(self, pairs):
+        """Rates (item, response) pairs and returns rows in the ratings.csv format."""
+        pairs = list(pairs)
+        if not pairs:
+            return [], []
+        header = ["item", "response", LOCAL_RATING_COLUMN]
+        rows = [None] * len(pairs)
+        # Batch the responses per item
+        by_item = {}
+        for i, (item, response) in enumerate(pairs):
+            by_item.setdefault(item, []).append(i)
+        for item, positions in by_item.items():
+            distances = self.distances(item, [pairs[i][1] for i in positions])
+            for i, distance in zip(positions, distances):
+                rating = "NA" if np.isnan(distance) else f"{distance:.4f}"
+                rows[i] = [item, pairs[i][1], rating]
+        return header, rows
+
+    def close(self):
+        pass
@@ -0,0 +1,375 @@
+"""Network service mode: remote clients start sessions, send audio or transcripts, and follow the results live.
+
+Each session runs the usual pipeline (extraction, scoring, archiving into data/) inside this process and
+publishes every transcript, idea and rating as an event. Any number of dashboards follow a session as
+Server-Sent Events; each event is encoded once and written to every dashboard from the session's EventLog.
+
+Endpoints:
+- POST /sessions {"participant", "item", "audio": false} → {"id"}; with audio, the session runs speech recognition
+- POST /sessions/<id>/transcripts  text of a final transcript (sessions without audio)
+- POST /sessions/<id>/audio        raw 16-bit mono PCM at RATE (sessions with audio)
+- POST /sessions/<id>/stop         finishes and archives the session (also DELETE /sessions/<id>)
+- GET  /sessions                   the running and finished sessions
+- GET  /sessions/<id>/events       text/event-stream of {"type": "transcript" | "idea" | "rating" | "end", "time", ...}
+- GET  /                           a minimal dashboard
+
+Usage: python session_server.py [--host 127.0.0.1] [--port 8000]
+"""
+import argparse
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import idea_extractor
+from audio_buffer import BufferedAudioStream
+
+SERVER_PORT = 8000
+# Seconds between keepalive comments on idle event streams, so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
+# Seconds to wait for a new session's pipeline to start
+SESSION_START_TIMEOUT = 10
+# Seconds of received audio the speech stream can fall behind
+REMOTE_AUDIO_BUFFER_SECONDS = 30
+
+_SESSION_PATH = re.compile(r"^/sessions/([0-9a-f]+)(?:/(\w+))?/?$")
+
+
+class RemoteAudioStream(BufferedAudioStream):
+    """Audio source for sessions whose audio is sent over the network, in place of MicrophoneStream."""
+    def __init__(self, rate, chunk, buffer_seconds=REMOTE_AUDIO_BUFFER_SECONDS):
+        super().__init__(rate, chunk, buffer_seconds)
+        # Bytes of an incomplete chunk, completed by the next write
+        self._pending = b""
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.closed = False
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.stop()
+
+    def write(self, data):
+        """Adds received PCM bytes, split into chunks of the speech stream's size."""
+        chunk_bytes = 2 * self.chunk  # 16-bit samples
+        with self._lock:
+            data = self._pending + bytes(data)
+            complete = len(data) - len(data) % chunk_bytes
+            for offset in range(0, complete, chunk_bytes):
+                self.buffer.write(data[offset:offset + chunk_bytes])
+            self._pending = data[complete:]
+
+    def stop(self):
+        self.closed = True
+        self.buffer.close()
+
+
+class ServedSession:
+    """A session started over the network, with the SSE frames of its events encoded once for all dashboards."""
+    def __init__(self, session_id, session, audio_stream=None):
+        self.id = session_id
+        self.session = session
+        self.audio_stream = audio_stream
+        self.shutdown = None
+        self.future = None
+        # Set by stop_session(); the session takes no more input while it drains
+        self.stopping = False
+        self._frames = []
+        self._lock = threading.Lock()
+
+    def frames(self, position, count):
+        """Returns the SSE frames of count events from position; each event is encoded once, under its position in the log."""
+        with self._lock:
+            if len(self._frames) < position + count:
+                events, _ = self.session.events.read(len(self._frames), timeout=0)
+                for event in events:
+                    self._frames.append(f"id: {len(self._frames)}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+            return b"".join(self._frames[position:position + count])
+
+    def describe(self):
+        session = self.session
+        return {"id": self.id, "participant": session.participant, "item": session.item,
+                "audio": self.audio_stream is not None, "finished": self.future.done(),
+                "ideas": len(session.ideas_list), "events": len(session.events), "folder": session.store.folder}
+
+
+class SessionServer:
+    """
+    HTTP server running sessions for remote clients; the sessions share the service clients and one event loop.
+
+    Parameters:
+    - host, port (optional): Address to listen on; port 0 picks a free port
+    """
+    def __init__(self, host="127.0.0.1", port=SERVER_PORT):
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        idea_extractor.startup_timer.restart()
+        if idea_extractor.PREWARM_SERVICES:
+            idea_extractor.prewarm_services()
+        self._loop_thread.start()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops accepting requests, then finishes and archives the running sessions."""
+        self._server.shutdown()
+        with self._lock:
+            served = list(self.sessions.values())
+        for session in served:
+            self.stop_session(session.id, wait=True)
+        self._server.server_close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._loop_thread.join()
+        idea_extractor.close_services()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, type, value, traceback):
+        self.stop()
+
+    def create_session(self, participant=None, item=None, audio=False):
+        """Starts a session; returns its ServedSession once transcripts can be added."""
+        session_id = uuid.uuid4().hex[:8]
+        participant = participant or idea_extractor.PARTICIPANT_NUMBERS
+        item = item or idea_extractor.TASK_ITEM
+        audio_stream = RemoteAudioStream(idea_extractor.RATE, idea_extractor.CHUNK) if audio else None
+        # The id keeps sessions of the same participant and item started in the same second apart
+        session_name = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{participant}_{item}_{session_id}"
+        session = idea_extractor.Session(participant, item, session_name=session_name, audio_stream=audio_stream)
+        served = ServedSession(session_id, session, audio_stream)
+        served.future = asyncio.run_coroutine_threadsafe(self._run(served), self.loop)
+        if not session.ready.wait(SESSION_START_TIMEOUT):
+            served.future.cancel()
+            raise RuntimeError(f"Session {session_id} did not start in time.")
+        with self._lock:
+            self.sessions[session_id] = served
+        print(f"🌐 Started session {session_id} ({session.participant}, {session.item})")
+        return served
+
+    async def _run(self, served):
+        served.shutdown = asyncio.Event()
+        try:
+            await served.session.run(served.shutdown, listen=served.audio_stream is not None)
+        finally:
+            # Archiving writes files; the other sessions keep running meanwhile
+            await asyncio.to_thread(served.session.archive)
+
+    def stop_session(self, session_id, wait=False):
+        """Finishes a session; returns False for an unknown session."""
+        served = self.sessions.get(session_id)
+        if served is None:
+            return False
+        served.stopping = True
+        # Sessions are only listed once started, so the event exists
+        self.loop.call_soon_threadsafe(served.shutdown.set)
+        if served.audio_stream is not None:
+            served.audio_stream.stop()
+        if wait:
+            try:
+                served.future.result()
+            except Exception as e:
+                print(f"❌ Session {session_id} ended with an error: {e}")
+        return True
+
+
+DASHBOARD_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Idea extraction</title>
+<style>body{font-family:sans-serif;margin:2em}li{margin:.2em 0}.rating{color:#555;margin-left:.5em}</style></head>
+<body><h1>Idea extraction</h1><p id="sessions"></p><ol id="ideas"></ol>
+<script>
+const id = location.hash.slice(1);
+fetch("/sessions").then(r => r.json()).then(list => {
+  document.getElementById("sessions").innerHTML = list.map(s =>
+    `<a href="#${s.id}" onclick="setTimeout(() => location.reload())">${s.participant} / ${s.item}</a>`).join(" · ");
+});
+if (id) {
+  const ideas = {};
+  const source = new EventSource(`/sessions/${id}/events`);
+  source.addEventListener("idea", e => {
+    const event = JSON.parse(e.data), li = document.createElement("li");
+    li.textContent = event.idea;
+    ideas[event.idea] = li.appendChild(document.createElement("span"));
+    ideas[event.idea].className = "rating";
+    document.getElementById("ideas").appendChild(li);
+  });
+  source.addEventListener("rating", e => {
+    const event = JSON.parse(e.data);
+    if (ideas[event.idea]) ideas[event.idea].textContent = event.rating == null ? "–" : event.rating.toFixed(2);
+  });
+  source.addEventListener("end", () => source.close());
+}
+</script></body></html>
+"""
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=b"", content_type="text/plain"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status, value):
+            self._send(status, json.dumps(value).encode("utf-8"), "application/json")
+
+        def _body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _session(self):
+            match = _SESSION_PATH.match(self.path.split("?")[0])
+            if match is None:
+                return None, None
+            return server.sessions.get(match.group(1)), match.group(2)
+
+        def do_GET(self):
+            if self.path in ("/", "/index.html"):
+                self._send(200, DASHBOARD_HTML.encode("utf-8"), "text/html; charset=utf-8")
+                return
+            if self.path.rstrip("/") == "/sessions":
+                with server._lock:
+                    served_sessions = list(server.sessions.values())
+                self._send_json(200, [served.describe() for served in served_sessions])
+                return
+            served, action = self._session()
+            if served is None:
+                self._send(404)
+            elif action is None:
+                self._send_json(200, served.describe())
+            elif action == "events":
+                self._stream_events(served)
+            else:
+                self._send(404)
+
+        def _stream_events(self, served):
+            """Writes the session's events as they happen, from Last-Event-ID on when a dashboard reconnects."""
+            events_log = served.session.events
+            try:
+                position = int(self.headers.get("Last-Event-ID", -1)) + 1
+            except ValueError:
+                position = 0
+            # An id from another server run may be out of range; resume at the nearest valid position
+            position = min(max(position, 0), len(events_log))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            # The stream has no length; it ends by closing the connection
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            try:
+                while True:
+                    events, closed = events_log.read(position, timeout=SSE_KEEPALIVE_SECONDS)
+                    if events:
+                        self.wfile.write(served.frames(position, len(events)))
+                        position += len(events)
+                    elif closed:
+                        return
+                    else:
+                        self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The dashboard went away
+                pass
+            except Exception as e:
+                print(f"❌ Error streaming events of session {served.id}: {e}")
+
+        def do_POST(self):
+            body = self._body()
+            if self.path.rstrip("/") == "/sessions":
+                try:
+                    request = json.loads(body) if body else {}
+                    served = server.create_session(request.get("participant"), request.get("item"), bool(request.get("audio")))
+                except (ValueError, AttributeError) as e:
+                    self._send_json(400, {"error": str(e)})
+                    return
+                except FileExistsError as e:
+                    # The session folder is taken, e.g. by an unfinished session
+                    self._send_json(409, {"error": str(e)})
+                    return
+                except RuntimeError as e:
+                    self._send_json(503, {"error": str(e)})
+                    return
+                except OSError as e:
+                    self._send_json(500, {"error": str(e)})
+                    return
+                self._send_json(201, {"id": served.id, "events": f"/sessions/{served.id}/events"})
+                return
+            served, action = self._session()
+            if served is None:
+                self._send(404)
+            elif served.future.done():
+                self._send(409, b"Session is finished.")
+            elif action in ("transcripts", "audio") and (served.stopping or served.session.terminated):
+                # The pipeline is draining; a new transcript could wait for it forever
+                self._send(409, b"Session is stopping.")
+            elif action == "transcripts":
+                transcript = body.decode("utf-8").strip()
+                if transcript:
+                    served.session.add_transcript(transcript)
+                self._send(202)
+            elif action == "audio":
+                if served.audio_stream is None:
+                    self._send(409, b"Session was started without audio.")
+                    return
+                served.audio_stream.write(body)
+                self._send(202)
+            elif action == "stop":
+                server.stop_session(served.id)
+                self._send(202)
+            else:
+                self._send(404)
+
+        def do_DELETE(self):
+            served, action = self._session()
+            if served is None or action is not None:
+                self._send(404)
+                return
+            server.stop_session(served.id)
+            self._send(202)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs idea extraction sessions for remote clients and dashboards.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+
+    server = SessionServer(args.host, args.port).start()
+    print(f"🌐 Serving sessions at {server.url} (dashboard at {server.url}/). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping sessions...")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
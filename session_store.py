@@ -0,0 +1,201 @@
+"""Append-only files of a session, written into its final folder while the session runs.
+
+Usage: python session_store.py [data] — recovers sessions that did not finish (e.g. after a crash)
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+
+SESSION_MANIFEST_FILENAME = "session.json"
+# Locked by the process recording the session, so recovery can tell a running session from a crashed one
+SESSION_LOCK_FILENAME = "session.lock"
+TRANSCRIPTS_FILENAME = "transcripts.csv"
+IDEA_PAIRS_FILENAME = "idea_pairs.csv"
+RATINGS_FILENAME = "ratings.csv"
+IDEA_COMPARISON_FILENAME = "idea_comparison.csv"
+IDEA_COMPARISON_HEADER = ["manually extracted ideas", "automatically extracted ideas", "codes"]
+
+
+def read_rows(path):
+    """Reads the rows of a CSV file, without empty rows ([] if the file does not exist)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        return [row for row in csv.reader(file) if row]
+
+
+def write_manifest(folder, manifest):
+    """Replaces the manifest atomically, so a crash leaves either the old or the new one."""
+    path = os.path.join(folder, SESSION_MANIFEST_FILENAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def read_manifest(folder):
+    path = os.path.join(folder, SESSION_MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def lock_file(file):
+    """Takes an exclusive lock on an open file without waiting; returns False if another process holds it.
+
+    The operating system releases the lock when its process ends, also when it crashes.
+    """
+    try:
+        if os.name == "nt":
+            import msvcrt
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def count_records(folder):
+    """Counts the transcripts, ideas and ratings in a session folder."""
+    return {
+        "transcripts": len(read_rows(os.path.join(folder, TRANSCRIPTS_FILENAME))),
+        "ideas": max(0, len(read_rows(os.path.join(folder, IDEA_PAIRS_FILENAME))) - 1),
+        "ratings": max(0, len(read_rows(os.path.join(folder, RATINGS_FILENAME))) - 1),
+    }
+
+
+class SessionStore:
+    """
+    Transcripts, ideas and ratings of a session, appended to the archive files as they happen.
+
+    Every row is flushed when it is written, so a crashed session keeps everything up to the crash,
+    and finishing a session only closes the files and marks its manifest as finished. The files have
+    the layout of an archived session: transcripts.csv, idea_pairs.csv, idea_comparison.csv and ratings.csv.
+    Only a finished session's folder is replaced; one that is still recording or was recovered is refused.
+    """
+    def __init__(self, folder, **details):
+        self.folder = os.path.abspath(folder)
+        os.makedirs(self.folder, exist_ok=True)
+        # Held until finalize(); the lock file is opened without truncating, it may belong to a running session
+        self._lock_file = open(os.path.join(self.folder, SESSION_LOCK_FILENAME), "a+", encoding="utf-8")
+        if not lock_file(self._lock_file):
+            self._lock_file.close()
+            raise FileExistsError(f"Session folder {self.folder} is in use by another process.")
+        manifest = read_manifest(self.folder)
+        if manifest is not None and manifest.get("status") != "finished":
+            self._release()
+            raise FileExistsError(f"Session folder {self.folder} holds an unfinished session "
+                                  f"({manifest.get('status')}); it is not overwritten.")
+        self._lock_file.truncate(0)
+        self._lock_file.write(str(os.getpid()))
+        self._lock_file.flush()
+        self._lock = threading.Lock()
+        self._files = {}
+        self.transcripts = 0
+        self.ideas = 0
+        self.ratings = 0
+        # A new session starts with empty files, replacing an earlier run of the same name
+        self._open(TRANSCRIPTS_FILENAME)
+        self._open(IDEA_PAIRS_FILENAME, ["item", "response"])
+        self._open(IDEA_COMPARISON_FILENAME, IDEA_COMPARISON_HEADER)
+        self._ratings_header = ["item", "response"]
+        self._open(RATINGS_FILENAME, self._ratings_header)
+        self.manifest = dict(details, status="recording", started=datetime.now().isoformat(timespec="seconds"))
+        write_manifest(self.folder, self.manifest)
+
+    def _open(self, filename, header=None):
+        file = open(os.path.join(self.folder, filename), "w", newline="", encoding="utf-8")
+        self._files[filename] = (file, csv.writer(file))
+        if header is not None:
+            self._append(filename, [header])
+
+    def _append(self, filename, rows):
+        file, writer = self._files[filename]
+        writer.writerows(rows)
+        file.flush()
+
+    def add_transcripts(self, transcripts):
+        with self._lock:
+            self._append(TRANSCRIPTS_FILENAME, [[transcript] for transcript in transcripts])
+            self.transcripts += len(transcripts)
+
+    def add_ideas(self, item, ideas):
+        with self._lock:
+            self._append(IDEA_PAIRS_FILENAME, [[item, idea] for idea in ideas])
+            self._append(IDEA_COMPARISON_FILENAME, [["", idea, ""] for idea in ideas])
+            self.ideas += len(ideas)
+
+    def add_ratings(self, header, rows):
+        """Appends SemDis rating rows; a longer header than the one written so far rewrites the file once."""
+        with self._lock:
+            if list(header) != self._ratings_header and len(header) >= len(self._ratings_header):
+                # Rare: the first ratings, or a SemDis version with more columns
+                file, _ = self._files.pop(RATINGS_FILENAME)
+                file.close()
+                earlier = read_rows(os.path.join(self.folder, RATINGS_FILENAME))[1:]
+                self._ratings_header = list(header)
+                self._open(RATINGS_FILENAME, self._ratings_header)
+                self._append(RATINGS_FILENAME, earlier)
+            self._append(RATINGS_FILENAME, rows)
+            self.ratings += len(rows)
+
+    def finalize(self, **details):
+        """Closes the files and marks the session as finished."""
+        with self._lock:
+            for file, _ in self._files.values():
+                file.close()
+            self._files.clear()
+            self.manifest.update(details, status="finished", finished=datetime.now().isoformat(timespec="seconds"),
+                                 transcripts=self.transcripts, ideas=self.ideas, ratings=self.ratings)
+            write_manifest(self.folder, self.manifest)
+            self._release()
+
+    def _release(self):
+        # Closing the file releases the lock
+        self._lock_file.close()
+        os.remove(self._lock_file.name)
+
+
+def recover_sessions(data_folder):
+    """Marks sessions left recording by a crash as recovered; returns their folders and record counts.
+
+    Their transcripts, ideas and ratings were written as they happened, so only the finishing step is missing.
+    Sessions still recording in another process hold their lock file and are skipped.
+    """
+    recovered = []
+    for folder in sorted(glob.glob(os.path.join(data_folder, "*"))):
+        manifest = read_manifest(folder) if os.path.isdir(folder) else None
+        if manifest is None or manifest.get("status") != "recording":
+            continue
+        with open(os.path.join(folder, SESSION_LOCK_FILENAME), "a+", encoding="utf-8") as file:
+            if not lock_file(file):
+                continue
+            counts = count_records(folder)
+            manifest.update(counts, status="recovered", recovered=datetime.now().isoformat(timespec="seconds"))
+            write_manifest(folder, manifest)
+        os.remove(os.path.join(folder, SESSION_LOCK_FILENAME))
+        recovered.append((folder, counts))
+    return recovered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recovers sessions that did not finish.")
+    parser.add_argument("data", nargs="?", default="data", help="folder of the archived sessions")
+    args = parser.parse_args()
+    recovered = recover_sessions(args.data)
+    for folder, counts in recovered:
+        print(f"♻️ Recovered {os.path.basename(folder)}: {counts['transcripts']} transcripts, "
+              f"{counts['ideas']} ideas, {counts['ratings']} ratings")
+    if not recovered:
+        print("No unfinished sessions found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import re
+import numpy as np
+
+
+def normalize(text):
+    """Lowercased words without punctuation, for comparing interim and final transcripts."""
+    return " ".join(re.findall(r"[\w']+", text.lower()))
+
+
+def remainder(text, speculation):
+    """The part of a final transcript after the words of the speculation it extends."""
+    words = re.finditer(r"[\w']+", text)
+    for _ in range(len(speculation.words.split())):
+        next(words, None)
+    word = next(words, None)
+    return text[word.start():] if word is not None else ""
+
+
+class Speculation:
+    """An extraction request started on an interim transcript."""
+    def __init__(self, text, future, timings):
+        self.text = text
+        self.words = normalize(text)
+        # Resolves to the candidate ideas of the request
+        self.future = future
+        # "llm_start" and "llm_end" of the request
+        self.timings = timings
+
+
+class SpeculationTracker:
+    """
+    The speculative request of the utterance being spoken, and how speculating paid off.
+
+    A stable interim transcript starts a request. A later interim that only adds words keeps it; one that
+    revises it starts a new request. When the final transcript arrives it matches the speculation (the
+    ideas are used as they are, no new request), extends it (the ideas are used and only the added words
+    are sent in a new request) or differs from it (the speculation is wasted). All methods are called from the session's event loop.
+    """
+    def __init__(self, min_stability=0.8, min_words=3):
+        self.min_stability = min_stability
+        self.min_words = min_words
+        self.current = None
+        # Outcomes by final transcript, until the extraction stage takes them
+        self._resolved = {}
+        # Counters
+        self.started = 0
+        self.reused = 0
+        self.extended = 0
+        self.wasted = 0
+        # Seconds each used speculation delivered its ideas before a request started at the final transcript would have
+        self.saved = []
+
+    def should_start(self, text, stability):
+        """Whether an interim transcript should start a speculative request."""
+        words = normalize(text)
+        if stability < self.min_stability or len(words.split()) < self.min_words:
+            return False
+        if self.current is None:
+            return True
+        # The final transcript can still match or extend the running speculation
+        return not (words == self.current.words or words.startswith(self.current.words + " "))
+
+    def start(self, speculation):
+        if self.current is not None:
+            # Revised by the speech recognition before it was final
+            self.wasted += 1
+        self.current = speculation
+        self.started += 1
+
+    def resolve(self, final_text):
+        """Compares the running speculation with a final transcript; the outcome is kept for take()."""
+        speculation, self.current = self.current, None
+        if speculation is None:
+            return
+        words = normalize(final_text)
+        if words == speculation.words:
+            self.reused += 1
+            self._resolved[final_text] = ("reused", speculation)
+        elif words.startswith(speculation.words + " "):
+            self.extended += 1
+            self._resolved[final_text] = ("extended", speculation)
+        else:
+            self.wasted += 1
+
+    def take(self, final_text):
+        """Returns (outcome, speculation) of a final transcript, or (None, None) without a usable speculation."""
+        return self._resolved.pop(final_text, (None, None))
+
+    def record_saved(self, speculation, requested):
+        """Records the time saved by a used speculation, given when a request on the final transcript would have started."""
+        timings = speculation.timings
+        if "llm_start" not in timings or "llm_end" not in timings:
+            return
+        # A request started at the final transcript would have taken as long as the speculative one
+        self.saved.append(max(0.0, min(timings["llm_end"] - timings["llm_start"], requested - timings["llm_start"])))
+
+    def stats(self):
+        # A speculation still running when the session ends was never used
+        wasted = self.wasted + (self.current is not None)
+        return {"started": self.started, "reused": self.reused, "extended": self.extended, "wasted": wasted,
+                "saved_p50": float(np.percentile(self.saved, 50)) if self.saved else 0.0,
+                "saved_total": float(sum(self.saved))}
+
+    def report(self):
+        stats = self.stats()
+        return (f"{stats['started']} speculative requests: {stats['reused']} reused, {stats['extended']} extended, "
+                f"{stats['wasted']} wasted; saved p50 {stats['saved_p50']:.2f} s, {stats['saved_total']:.1f} s in total")
@@ -0,0 +1,23 @@
+import os
+import sys
+import unicodedata
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from semdis_local import LocalSemDisScorer, WordVectors, tokenize
+
+
+def test_tokenize_keeps_accented_words_whole():
+    assert tokenize("Open a café") == ["open", "café"]
+    # The same word typed with a combining accent
+    assert tokenize(unicodedata.normalize("NFD", "Open a café")) == ["open", "café"]
+    assert tokenize("Crème brûlée, 2 spoons") == ["crème", "brûlée", "spoons"]
+
+
+def test_accented_response_is_scored_on_its_words():
+    vectors = WordVectors(["brick", "café", "caf"], np.array([[1.0, 0.0], [0.6, 0.8], [0.0, 1.0]]))
+    header, rows = LocalSemDisScorer(vectors).rate([("brick", "a café")])
+    assert header[-1] == "SemDis_local"
+    # 1 - cos(brick, café), not the distance to "caf"
+    assert rows == [["brick", "a café", "0.4000"]]
@@ -0,0 +1,177 @@
+import contextlib
+import csv
+import os
+import threading
+import time
+import numpy as np
+
+LATENCY_SUMMARY_FILENAME = "latency.csv"
+LATENCY_TRACES_FILENAME = "latency_traces.csv"
+# Timestamps a trace can carry, in pipeline order
+EVENTS = ("stt_final", "llm_start", "llm_end", "semdis_upload", "semdis_download", "cached", "rendered")
+# Latency segments: name -> (start events, end event); the first start event that was recorded is used
+SEGMENTS = {
+    "transcript_queue": (("stt_final",), "llm_start"),
+    "llm": (("llm_start",), "llm_end"),
+    "scoring_queue": (("llm_end",), "semdis_upload"),
+    "semdis": (("semdis_upload",), "semdis_download"),
+    "render": (("semdis_download", "cached"), "rendered"),
+    "total": (("stt_final",), "rendered"),
+}
+# Events after which an idea has its rating
+RATED_EVENTS = ("semdis_download", "cached")
+# Per extraction request: from its final transcript to its first rated idea
+REQUEST_SEGMENT = "first_rated"
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyTracer:
+    """
+    Timestamps of each transcript and idea on its way from the final STT result to its first plotted rating.
+
+    Transcripts get a trace per final result; ideas are traced by their text, which is unique within a
+    session, so later stages only need the idea to add their timestamp. The first timestamp of an event wins.
+    """
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._start = self.clock()
+            self._traces = []
+            self._ideas = {}
+            self._version = 0
+
+    def now(self):
+        return self.clock()
+
+    def add(self, kind, text, **timestamps):
+        """Starts the trace of a "transcript" or an "idea" with the given event timestamps."""
+        trace = {"kind": kind, "text": text, **{event: value for event, value in timestamps.items() if value is not None}}
+        with self._lock:
+            self._traces.append(trace)
+            if kind == "idea":
+                self._ideas.setdefault(text, trace)
+            self._version += 1
+
+    def mark(self, ideas, event, timestamp=None):
+        """Records an event for traced ideas that do not have it yet."""
+        timestamp = self.clock() if timestamp is None else timestamp
+        with self._lock:
+            for idea in ideas:
+                trace = self._ideas.get(idea)
+                if trace is not None and event not in trace:
+                    trace[event] = timestamp
+                    self._version += 1
+
+    def version(self):
+        """Changes whenever a timestamp is recorded."""
+        with self._lock:
+            return self._version
+
+    def latencies(self):
+        """Returns {(kind, segment): [seconds]} for all traces that reached both ends of a segment."""
+        with self._lock:
+            traces = [dict(trace) for trace in self._traces]
+        latencies = {}
+        for trace in traces:
+            for segment, (starts, end) in SEGMENTS.items():
+                start = next((trace[event] for event in starts if event in trace), None)
+                if start is not None and end in trace:
+                    latencies.setdefault((trace["kind"], segment), []).append(trace[end] - start)
+        # The ideas of one extraction request share its final transcript and start time
+        first_rated = {}
+        for trace in traces:
+            rated = min((trace[event] for event in RATED_EVENTS if event in trace), default=None)
+            if trace["kind"] != "idea" or rated is None or "stt_final" not in trace or "llm_start" not in trace:
+                continue
+            request = (trace["stt_final"], trace["llm_start"])
+            first_rated[request] = min(first_rated.get(request, rated), rated)
+        if first_rated:
+            latencies[("request", REQUEST_SEGMENT)] = [rated - stt_final for (stt_final, _), rated in first_rated.items()]
+        return latencies
+
+    def summary(self):
+        """Returns one row per kind and segment: kind, segment, count, mean, p50, p95, p99, max (seconds)."""
+        rows = []
+        for (kind, segment), values in self.latencies().items():
+            values = np.asarray(values)
+            rows.append([kind, segment, len(values), float(values.mean()),
+                         *(float(p) for p in np.percentile(values, PERCENTILES)), float(values.max())])
+        order = list(SEGMENTS) + [REQUEST_SEGMENT]
+        rows.sort(key=lambda row: (row[0] != "idea", order.index(row[1])))
+        return rows
+
+    def report(self):
+        """Returns a one-line summary of the idea latencies, for live monitoring."""
+        return " | ".join(f"{segment}: p50 {p50:.2f} s, p95 {p95:.2f} s ({count})"
+                          for kind, segment, count, mean, p50, p95, p99, maximum in self.summary() if kind == "idea")
+
+    def write(self, folder):
+        """Writes the latency summary and the individual traces (seconds since session start) into a folder."""
+        with open(os.path.join(folder, LATENCY_SUMMARY_FILENAME), mode="w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["kind", "segment", "count", "mean", *(f"p{p}" for p in PERCENTILES), "max"])
+            for row in self.summary():
+                writer.writerow(row[:3] + [f"{value:.3f}" for value in row[3:]])
+        with self._lock:
+            traces = [dict(trace) for trace in self._traces]
+            start = self._start
+        with open(os.path.join(folder, LATENCY_TRACES_FILENAME), mode="w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["kind", "text", *EVENTS])
+            for trace in traces:
+                writer.writerow([trace["kind"], trace["text"],
+                                 *(f"{trace[event] - start:.3f}" if event in trace else "" for event in EVENTS)])
+
+
+class StartupTimer:
+    """
+    When each startup step ran, as offsets from the start of the session.
+
+    Steps run in parallel threads, so the session is ready after the slowest one rather than after
+    all of them in turn; report() shows both.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.restart()
+
+    def restart(self):
+        with self._lock:
+            self._start = self.clock()
+            self._steps = {}
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        """Records the time spent in the with block as the step name."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            end = self.clock()
+            with self._lock:
+                self._steps[name] = (start - self._start, end - self._start)
+
+    def mark(self, name):
+        """Records a step that ran from the start of the session until now."""
+        with self._lock:
+            self._steps[name] = (0.0, self.clock() - self._start)
+
+    def steps(self):
+        """Returns {step: seconds} in the order the steps finished."""
+        with self._lock:
+            ordered = sorted(self._steps.items(), key=lambda step: step[1][1])
+        return {name: end - start for name, (start, end) in ordered}
+
+    def report(self):
+        with self._lock:
+            spans = list(self._steps.values())
+        if not spans:
+            return ""
+        steps = " | ".join(f"{name} {seconds:.2f} s" for name, seconds in self.steps().items())
+        ready = max(end for _, end in spans)
+        sequential = sum(end - start for start, end in spans)
+        return f"{steps} | ready after {ready:.2f} s ({sequential:.2f} s one after another)"
@@ -0,0 +1,91 @@
+import math
+
+
+def estimate_tokens(text):
+    """Rough token count of English text (about four characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+class TranscriptWindow:
+    """Strategy that chooses the transcripts sent with each extraction request."""
+    name = None
+
+    def select(self, transcripts, new):
+        """Returns the transcripts to send, given all transcripts so far and how many of them were not sent yet."""
+        raise NotImplementedError
+
+    def extracted(self, sent_until, found_ideas):
+        """Called after a request with the number of transcripts it covered and whether it found new ideas."""
+
+
+class LastNWindow(TranscriptWindow):
+    """Sends the last n transcripts, so every transcript is sent up to n times."""
+    name = "last_n"
+
+    def __init__(self, n=4):
+        self.n = n
+
+    def select(self, transcripts, new):
+        return transcripts[-max(self.n, new):]
+
+    def __repr__(self):
+        return f"{self.name}({self.n})"
+
+
+class TokenBudgetWindow(TranscriptWindow):
+    """Sends the new transcripts plus as many earlier ones as fit into a token budget."""
+    name = "token_budget"
+
+    def __init__(self, max_tokens=150):
+        self.max_tokens = max_tokens
+
+    def select(self, transcripts, new):
+        start = len(transcripts) - max(new, 1)
+        used = sum(estimate_tokens(transcript) for transcript in transcripts[start:])
+        while start > 0 and used + estimate_tokens(transcripts[start - 1]) <= self.max_tokens:
+            start -= 1
+            used += estimate_tokens(transcripts[start])
+        return transcripts[start:]
+
+    def __repr__(self):
+        return f"{self.name}({self.max_tokens})"
+
+
+class SinceExtractionWindow(TranscriptWindow):
+    """
+    Sends everything since the last request that found new ideas, at most max_transcripts.
+
+    Speech that produced no idea may hold the start of one, so it is sent again until an idea is found.
+    """
+    name = "since_extraction"
+
+    def __init__(self, max_transcripts=8):
+        self.max_transcripts = max_transcripts
+        self.start = 0
+
+    def select(self, transcripts, new):
+        start = max(self.start, len(transcripts) - max(self.max_transcripts, new))
+        # Always send at least the newest transcript
+        return transcripts[min(start, len(transcripts) - 1):]
+
+    def extracted(self, sent_until, found_ideas):
+        if found_ideas:
+            # Requests may finish out of order
+            self.start = max(self.start, sent_until)
+
+    def __repr__(self):
+        return f"{self.name}({self.max_transcripts})"
+
+
+class OverlapWindow(TranscriptWindow):
+    """Sends the new transcripts plus the last overlap ones already sent, for ideas spanning two transcripts."""
+    name = "overlap"
+
+    def __init__(self, overlap=1):
+        self.overlap = overlap
+
+    def select(self, transcripts, new):
+        return transcripts[-(max(new, 1) + self.overlap):]
+
+    def __repr__(self):
+        return f"{self.name}({self.overlap})"
@@ -0,0 +1,120 @@
+import collections
+import numpy as np
+
+# Analysis frame length within each chunk (seconds)
+FRAME_SECONDS = 0.01
+# A frame is speech if it is this much louder than the noise floor...
+ENERGY_MARGIN_DB = 10.0
+# ...or, for quiet fricatives (s, f, th), a little louder with many zero crossings
+FRICATIVE_MARGIN_DB = 4.0
+FRICATIVE_ZCR = 0.25
+# Speech frames a chunk needs to count as speech
+MIN_SPEECH_FRAMES = 2
+# The noise floor adapts to the silence between utterances, but never drops below this (digital silence)
+MIN_NOISE_FLOOR_DB = -70.0
+NOISE_FLOOR_ADAPTATION = 0.05
+# The noise floor starts as the quietest of the first chunks, so speech at the start is not taken for noise;
+# until then every chunk counts as speech
+NOISE_FLOOR_SEED_CHUNKS = 10
+
+
+class VoiceActivityDetector:
+    """Classifies 16-bit mono chunks as speech or silence from per-frame energy and zero-crossing rate."""
+    def __init__(self, rate):
+        self.frame_length = max(1, int(rate * FRAME_SECONDS))
+        self.noise_floor = None
+        self._seed_chunks = 0
+
+    def features(self, chunk):
+        """Returns the energy (dBFS) and zero-crossing rate of each frame of a chunk."""
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        frames = samples[:len(samples) // self.frame_length * self.frame_length].reshape(-1, self.frame_length)
+        scaled = frames.astype(np.float32) / 32768.0
+        energy = 10.0 * np.log10(np.mean(scaled * scaled, axis=1) + 1e-12)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        return energy, zcr
+
+    def is_speech(self, chunk):
+        energy, zcr = self.features(chunk)
+        if not len(energy):
+            return False
+        if self._seed_chunks < NOISE_FLOOR_SEED_CHUNKS:
+            self._seed_chunks += 1
+            level = max(float(np.median(energy)), MIN_NOISE_FLOOR_DB)
+            self.noise_floor = level if self.noise_floor is None else min(self.noise_floor, level)
+            return True
+        speech_frames = ((energy > self.noise_floor + ENERGY_MARGIN_DB)
+                         | ((energy > self.noise_floor + FRICATIVE_MARGIN_DB) & (zcr > FRICATIVE_ZCR)))
+        speech = int(speech_frames.sum()) >= MIN_SPEECH_FRAMES
+        if not speech:
+            # Quieter silence lowers the floor at once, louder noise raises it slowly
+            level = float(np.median(energy))
+            floor = min(level, (1 - NOISE_FLOOR_ADAPTATION) * self.noise_floor + NOISE_FLOOR_ADAPTATION * level)
+            self.noise_floor = max(floor, MIN_NOISE_FLOOR_DB)
+        return speech
+
+
+class VoiceActivityGate:
+    """
+    Passes on only the audio around speech: pre-roll chunks before each onset, so the starts of words
+    are kept, and a hangover after the last speech chunk, so pauses inside sentences are kept.
+
+    During long silences a held back chunk is sent every keepalive seconds, so the speech stream is not
+    closed for missing audio. The gate lasts the whole session; reset() starts a new speech stream.
+    """
+    def __init__(self, rate, chunk_seconds, hangover=0.5, preroll=0.3, keepalive=5.0):
+        self.detector = VoiceActivityDetector(rate)
+        self.hangover_chunks = round(hangover / chunk_seconds)
+        self.keepalive_chunks = max(1, round(keepalive / chunk_seconds))
+        self._preroll = collections.deque(maxlen=round(preroll / chunk_seconds))
+        self._remaining = 0
+        self._silent = 0
+        # Counters, over the distinct positions seen (replayed audio is counted once)
+        self._last_position = -1
+        self.chunks = 0
+        self.suppressed = 0
+
+    def reset(self):
+        """Clears the speech state for a new speech stream; the noise floor and counters are kept."""
+        self._preroll.clear()
+        self._remaining = 0
+        self._silent = 0
+
+    def process(self, position, chunk):
+        """Returns the (position, chunk) pairs to send for the chunk at a buffer position."""
+        counted = position > self._last_position
+        if counted:
+            self._last_position = position
+            self.chunks += 1
+        if self.detector.is_speech(chunk):
+            self._remaining = self.hangover_chunks
+            # The pre-roll chunks were counted as suppressed when they were held back
+            self.suppressed -= sum(1 for _, _, held_counted in self._preroll if held_counted)
+            forward = [(held_position, held) for held_position, held, _ in self._preroll] + [(position, chunk)]
+            self._preroll.clear()
+        elif self._remaining > 0:
+            self._remaining -= 1
+            forward = [(position, chunk)]
+        else:
+            self._preroll.append((position, chunk, counted))
+            forward = []
+        if forward:
+            self._silent = 0
+            return forward
+        if counted:
+            self.suppressed += 1
+        self._silent += 1
+        if self._silent >= self.keepalive_chunks:
+            self._silent = 0
+            if not self._preroll:
+                return [(position, bytes(len(chunk)))]
+            # The oldest held chunk is sent, which keeps the positions sent in order and each sent once
+            held_position, held, held_counted = self._preroll.popleft()
+            self.suppressed -= held_counted
+            return [(held_position, held)]
+        return []
+
+    @property
+    def suppressed_fraction(self):
+        return self.suppressed / self.chunks if self.chunks else 0.0